@@ -0,0 +1,152 @@
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+# Rough Gemini tokenizer ratio for English transcripts
+CHARS_PER_TOKEN = 4
+
+# Characters added per caption by the `[HH:MM:SS,mmm - HH:MM:SS,mmm] ` prefix and newline
+TIMESTAMP_OVERHEAD_CHARS = 30
+
+# An anchor is only kept while the batch it ends holds at least this fraction of the pause-window fill
+ANCHOR_MIN_FILL = 0.5
+
+
+def estimate_tokens(text):
+    """Estimate the token count of a string (or a character count)."""
+    chars = text if isinstance(text, int) else len(text)
+    return -(-chars // CHARS_PER_TOKEN)
+
+
+def plan_batches(captions, token_budget, overlap_seconds=0, pause_window=0.2, anchors=None):
+    """
+    Cut a caption store into contiguous ranges that fit a token budget.
+
+    Each batch is filled greedily up to `token_budget` tokens of timestamped
+    transcript. Within the last `pause_window` fraction of the budget the cut
+    is placed after the caption followed by the longest pause, so batches
+    tend to end between sentences or topics rather than mid-thought.
+
+    With `anchors` (the cut times of an earlier plan, see plan_anchors), a
+    batch ends at the first anchor after its start whenever that still fits
+    the budget and keeps the batch at least ANCHOR_MIN_FILL of the way to the
+    pause window. After a local edit to the transcript every other cut then stays
+    where it was, and so does the text of every batch the edit did not touch.
+
+    Args:
+        captions: CaptionStore ordered by start time
+        token_budget: Maximum estimated transcript tokens per batch
+        overlap_seconds: Captions from this many seconds before a cut are repeated
+            at the start of the next batch
+        pause_window: Fraction of the budget in which to look for a pause
+        anchors: Optional sorted caption start times (ms) to cut at where possible
+
+    Returns:
+        List of (lo, hi) caption ranges; with overlap, consecutive ranges share captions
+    """
+    n = len(captions)
+    if n == 0:
+        return []
+
+    # Prefix sums of estimated tokens per timestamped caption line
+    offsets = captions.offsets
+    cumulative = [0] + list(accumulate(
+        estimate_tokens(offsets[i + 1] - offsets[i] + TIMESTAMP_OVERHEAD_CHARS) for i in range(n)
+    ))
+    starts, ends = captions.starts, captions.ends
+    min_fill = token_budget * (1 - pause_window)
+    # Captions the earlier plan cut before
+    anchor_cuts = sorted({bisect_left(starts, anchor) for anchor in anchors or ()} - {0, n})
+
+    batches = []
+    lo = 0
+    while True:
+        # Furthest end that keeps [lo, hi) within budget, always taking at least one caption
+        hi = max(lo + 1, bisect_right(cumulative, cumulative[lo] + token_budget) - 1)
+        if hi >= n:
+            batches.append((lo, n))
+            break
+
+        anchor = bisect_right(anchor_cuts, lo)
+        if (anchor < len(anchor_cuts) and anchor_cuts[anchor] <= hi
+                and cumulative[anchor_cuts[anchor]] - cumulative[lo] >= ANCHOR_MIN_FILL * min_fill):
+            cut = anchor_cuts[anchor]
+        else:
+            # Prefer the longest pause among cuts that already fill most of the budget
+            first_candidate = max(lo + 1, bisect_left(cumulative, cumulative[lo] + min_fill))
+            cut = max(
+                range(first_candidate, hi + 1),
+                key=lambda k: (starts[k] - ends[k - 1], k),
+                default=hi,
+            )
+        batches.append((lo, cut))
+
+        next_lo = cut
+        if overlap_seconds > 0:
+            next_lo = bisect_left(starts, starts[cut] - overlap_seconds * 1000, lo + 1, cut)
+        lo = next_lo
+    return batches
+
+
+def batch_cuts(captions, batches, token_budget, overlap_seconds=0, pause_window=0.2):
+    """
+    Record a batch plan for plan_anchors: its settings and the start times (ms) of the captions each batch but the last is cut before.
+
+    Args:
+        captions: CaptionStore the batches were planned over
+        batches: List of (lo, hi) caption ranges from plan_batches
+        token_budget, overlap_seconds, pause_window: Settings the batches were planned with
+
+    Returns:
+        JSON-serializable dict
+    """
+    return {
+        "token_budget": token_budget,
+        "overlap_seconds": overlap_seconds,
+        "pause_window": pause_window,
+        "cuts": [captions.starts[hi] for _, hi in batches[:-1]],
+    }
+
+
+def plan_anchors(record, token_budget, overlap_seconds=0, pause_window=0.2):
+    """
+    Return the cut times of a batch_cuts record as `anchors`, or None when it was planned with other settings.
+
+    A changed budget, overlap or pause window must re-plan every batch, not
+    keep the old cuts that happen to fit the new settings.
+    """
+    settings = {"token_budget": token_budget, "overlap_seconds": overlap_seconds, "pause_window": pause_window}
+    if not isinstance(record, dict) or any(record.get(key) != value for key, value in settings.items()):
+        return None
+    return record["cuts"]
+
+
+def batch_report(captions, batches, token_budget, prompt_overhead_tokens=0, include_context=True):
+    """
+    Summarize the expected cost of a batch plan.
+
+    Args:
+        captions: CaptionStore the batches were planned over
+        batches: List of (lo, hi) caption ranges from plan_batches
+        token_budget: Token budget the batches were planned against
+        prompt_overhead_tokens: Fixed prompt tokens added to every call
+        include_context: Count the previous batch's plain text, which is sent as context
+
+    Returns:
+        Dict with the call count, estimated prompt tokens (total, max and mean per
+        call) and the mean fraction of the transcript budget used per batch
+    """
+    tokens = []
+    transcript_tokens = 0
+    for i, (lo, hi) in enumerate(batches):
+        batch_tokens = estimate_tokens(captions.text_length(lo, hi) + (hi - lo) * TIMESTAMP_OVERHEAD_CHARS)
+        transcript_tokens += batch_tokens
+        if include_context and i > 0:
+            batch_tokens += estimate_tokens(captions.text_length(*batches[i - 1]))
+        tokens.append(batch_tokens + prompt_overhead_tokens)
+    return {
+        "calls": len(batches),
+        "total_tokens": sum(tokens),
+        "max_tokens": max(tokens, default=0),
+        "mean_tokens": sum(tokens) // len(tokens) if tokens else 0,
+        "mean_fill": transcript_tokens / (len(tokens) * token_budget) if tokens else 0,
+    }
@@ -0,0 +1,204 @@
+"""
+Run the transcript -> blog -> screenshots -> docx pipeline for many videos.
+
+The manifest is a JSON list of jobs:
+
+    [
+        {"transcript": "talk1.srt", "video_url": "https://youtu.be/...", "output_dir": "out/talk1"},
+        {"transcript": "talk2.vtt", "video_url": "https://youtu.be/...", "output_dir": "out/talk2"}
+    ]
+
+Each job runs its stages in order on its own thread. Stages are limited by
+the resource they wait on (RUNNER_LLM_JOBS, RUNNER_NETWORK_JOBS,
+RUNNER_CPU_JOBS), so one job's screenshots or Word conversion overlap the
+LLM calls of another.
+
+    python batch_runner.py jobs.json [--resume]
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from config import (INPUT_MARKDOWN, OUTPUT_MARKDOWN, OUTPUT_JSON, SCREENSHOTS_DIR, CHECKPOINT_DIR,
+                    RUNNER_LLM_JOBS, RUNNER_NETWORK_JOBS, RUNNER_CPU_JOBS, TRACE_DIR)
+from instrumentation import span, start_trace
+from script_01 import generate_blog, print_llm_stats
+from script_02 import (plan_screenshots, reusable_screenshots, record_screenshots, acquire_video, process_screenshots,
+                       inject_screenshots_to_markdown, cleanup_video)
+from script_03 import build_word_document
+
+STAGES = ("blog", "fetch", "screenshots", "docx")
+
+
+def load_manifest(path):
+    """
+    Read and validate a job manifest.
+
+    Returns:
+        List of job dictionaries with transcript, video_url and output_dir
+
+    Raises:
+        ValueError: If a job is missing a field or two jobs share an output directory
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        jobs = json.load(f)
+
+    seen = set()
+    for i, job in enumerate(jobs, 1):
+        missing = [field for field in ("transcript", "video_url", "output_dir") if not job.get(field)]
+        if missing:
+            raise ValueError(f"Job {i} in {path} is missing {', '.join(missing)}")
+        output_dir = os.path.abspath(job["output_dir"])
+        if output_dir in seen:
+            raise ValueError(f"Job {i} in {path} reuses output directory {job['output_dir']}")
+        seen.add(output_dir)
+    return jobs
+
+
+class StageLimits:
+    """Concurrency limit per kind of stage, plus the time jobs spent waiting for and running each."""
+
+    def __init__(self, llm, network, cpu):
+        self._semaphores = {
+            "llm": threading.BoundedSemaphore(llm),
+            "network": threading.BoundedSemaphore(network),
+            "cpu": threading.BoundedSemaphore(cpu),
+        }
+        self._lock = threading.Lock()
+        self.waited = {kind: 0.0 for kind in self._semaphores}
+        self.busy = {kind: 0.0 for kind in self._semaphores}
+
+    def run(self, kind, fn, *args):
+        start = time.perf_counter()
+        with self._semaphores[kind]:
+            acquired = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self.waited[kind] += acquired - start
+                    self.busy[kind] += time.perf_counter() - acquired
+
+
+def run_job(job, limits, resume=False):
+    """
+    Run every stage of one job, each under the limit of the resource it waits on.
+
+    Returns:
+        Dictionary mapping each completed stage to its duration in seconds
+    """
+    name = job.get("name") or os.path.basename(os.path.normpath(job["output_dir"]))
+    output_dir = job["output_dir"]
+    os.makedirs(output_dir, exist_ok=True)
+    blog_markdown = os.path.join(output_dir, os.path.basename(INPUT_MARKDOWN))
+    final_markdown = os.path.join(output_dir, os.path.basename(OUTPUT_MARKDOWN))
+    screenshots_dir = os.path.join(output_dir, os.path.basename(SCREENSHOTS_DIR))
+    os.makedirs(screenshots_dir, exist_ok=True)
+
+    durations = {}
+
+    def stage(stage_name, kind, fn, *args):
+        print(f"[{name}] {stage_name} started")
+        start = time.perf_counter()
+        with span(f"job_{stage_name}", "job", job=name, kind=kind):
+            result = limits.run(kind, fn, *args)
+        durations[stage_name] = time.perf_counter() - start
+        print(f"[{name}] {stage_name} finished in {durations[stage_name]:.1f}s")
+        return result
+
+    stage("blog", "llm", lambda: generate_blog(
+        job["transcript"],
+        output_markdown=blog_markdown,
+        output_json=os.path.join(output_dir, os.path.basename(OUTPUT_JSON)),
+        checkpoint_dir=os.path.join(output_dir, CHECKPOINT_DIR),
+        resume=resume,
+    ))
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        def fetch():
+            timestamps, targets = plan_screenshots(blog_markdown, job["video_url"], job["transcript"])
+            # Screenshots still up to date from an earlier run need no video
+            screenshot_paths, known_frames = reusable_screenshots(screenshots_dir, job["video_url"], targets)
+            missing = [timestamp for timestamp in timestamps if timestamp not in screenshot_paths]
+            video = acquire_video(job["video_url"], [targets[timestamp] for timestamp in missing], work_dir) if missing else None
+            return targets, screenshot_paths, known_frames, missing, video
+
+        targets, screenshot_paths, known_frames, missing, video = stage("fetch", "network", fetch)
+        try:
+            def screenshots():
+                if missing:
+                    screenshot_paths.update(process_screenshots(
+                        video, missing, screenshots_dir,
+                        targets={timestamp: targets[timestamp] for timestamp in missing}, known_frames=known_frames))
+                    record_screenshots(screenshots_dir, job["video_url"], targets, screenshot_paths, known_frames)
+                inject_screenshots_to_markdown(blog_markdown, final_markdown, screenshot_paths)
+
+            stage("screenshots", "cpu", screenshots)
+        finally:
+            if video is not None:
+                cleanup_video(video)
+
+    stage("docx", "cpu", build_word_document,
+          final_markdown, os.path.join(output_dir, Path(final_markdown).stem + '.docx'))
+    return durations
+
+
+def run_jobs(jobs, llm_jobs=RUNNER_LLM_JOBS, network_jobs=RUNNER_NETWORK_JOBS, cpu_jobs=RUNNER_CPU_JOBS,
+             resume=False):
+    """
+    Run all jobs as a pipeline; a failed job is reported and does not stop the others.
+
+    Returns:
+        List of (job, durations or None, error or None) in manifest order
+    """
+    limits = StageLimits(llm_jobs, network_jobs, cpu_jobs)
+    # A job holds its thread from start to finish; this many jobs in flight keeps
+    # every kind of stage busy without starting the whole manifest at once
+    max_workers = min(len(jobs), llm_jobs + network_jobs + cpu_jobs) or 1
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(run_job, job, limits, resume) for job in jobs]
+        results = []
+        for job, future in zip(jobs, futures):
+            try:
+                results.append((job, future.result(), None))
+            except Exception as e:
+                print(f"Job {job['output_dir']} failed: {e}")
+                results.append((job, None, e))
+    elapsed = time.perf_counter() - start
+
+    print("\n==== Batch Run Summary ====")
+    for job, durations, error in results:
+        status = f"failed: {error}" if error else ", ".join(f"{stage} {durations[stage]:.1f}s" for stage in STAGES)
+        print(f"{job['output_dir']}: {status}")
+    print(f"{sum(1 for _, _, error in results if error is None)}/{len(jobs)} jobs completed in {elapsed:.1f}s")
+    for kind in limits.busy:
+        print(f"{kind}: {limits.busy[kind]:.1f}s running, {limits.waited[kind]:.1f}s waiting for a slot")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("manifest", help="JSON list of {transcript, video_url, output_dir} jobs")
+    parser.add_argument("--resume", action="store_true",
+                        help="Rebuild only the blog stages whose inputs changed since the last run of each job")
+    parser.add_argument("--llm-jobs", type=int, default=RUNNER_LLM_JOBS, help="Jobs generating blogs at once")
+    parser.add_argument("--network-jobs", type=int, default=RUNNER_NETWORK_JOBS, help="Jobs downloading video at once")
+    parser.add_argument("--cpu-jobs", type=int, default=RUNNER_CPU_JOBS,
+                        help="Jobs capturing screenshots or writing Word documents at once")
+    args = parser.parse_args()
+
+    start_trace("batch_runner", TRACE_DIR)
+    results = run_jobs(load_manifest(args.manifest), args.llm_jobs, args.network_jobs, args.cpu_jobs, args.resume)
+    print_llm_stats()
+    if any(error for _, _, error in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Compare the HTML round-trip markdown-to-docx conversion with the direct token-stream converter.
+
+Generates a synthetic blog locally (500 sections by default, each with a
+screenshot, lists and inline formatting), converts it with the old
+`convert_markdown_to_word_html` and with `convert_markdown_to_word`, and
+prints the wall-clock time, peak traced memory and output size of each.
+
+    python benchmarks/bench_docx_conversion.py --sections 500
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from captions import ms_to_timestamp
+from script_03 import convert_markdown_to_word, convert_markdown_to_word_html
+
+
+def make_test_blog(path, screenshots_dir, sections, distinct_images=20, width=1920, height=1080):
+    """Write a blog with one screenshot per section, cycling through a few distinct images."""
+    rng = np.random.default_rng(0)
+    images = []
+    for i in range(distinct_images):
+        image_path = os.path.join(screenshots_dir, f"screenshot_{i:03d}.jpg")
+        frame = np.full((height, width, 3), 235, dtype=np.uint8)
+        frame[height // 2:] = rng.integers(0, 255, (height - height // 2, width, 3), dtype=np.uint8)
+        cv2.putText(frame, f"Slide {i}", (80, 200), cv2.FONT_HERSHEY_SIMPLEX, 5, (30, 30, 30), 10)
+        cv2.imwrite(image_path, frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        images.append(image_path)
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("# Synthetic Blog\n\n## Overview\n\nA generated blog used for benchmarking.\n\n")
+        for i in range(sections):
+            start, end = ms_to_timestamp(i * 300000, None), ms_to_timestamp((i + 1) * 300000, None)
+            f.write(f"## [{start} - {end}] Section {i + 1}\n\n")
+            f.write(f"![Screenshot at {start}]({images[i % distinct_images]})\n\n")
+            f.write("This section covers **important** points with *emphasis* and `inline_code()`. " * 4 + "\n\n")
+            f.write("- First point\n- Second point with **bold** text\n  - A nested detail\n\n")
+            f.write("1. Step one\n2. Step two\n\n")
+            f.write("```python\nprint('hello')\n```\n\n")
+
+
+def measure(convert, input_file, output_file):
+    """Return (seconds, peak traced bytes) of one conversion; timing runs without tracemalloc."""
+    start = time.perf_counter()
+    convert(input_file, output_file)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    convert(input_file, output_file)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=500, help="Number of blog sections to generate")
+    parser.add_argument("--images", type=int, default=20, help="Number of distinct screenshots")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        blog_path = os.path.join(work_dir, "blog.md")
+        make_test_blog(blog_path, work_dir, args.sections, args.images)
+        print(f"Generated {args.sections}-section blog ({os.path.getsize(blog_path) / 1024:.0f} KiB markdown)")
+
+        results = {}
+        for name, convert in (("HTML round trip", convert_markdown_to_word_html),
+                              ("Token stream", convert_markdown_to_word)):
+            output_file = os.path.join(work_dir, f"{convert.__name__}.docx")
+            seconds, peak = measure(convert, blog_path, output_file)
+            results[name] = (seconds, peak, os.path.getsize(output_file))
+
+    print("\n==== Markdown to Word Conversion ====")
+    for name, (seconds, peak, size) in results.items():
+        print(f"{name:16s} {seconds:6.2f}s  peak {peak / 1024 ** 2:6.1f} MiB  output {size / 1024 ** 2:6.1f} MiB")
+    (old_seconds, old_peak, _), (new_seconds, new_peak, _) = results.values()
+    print(f"Speedup: {old_seconds / new_seconds:.1f}x, peak memory: {new_peak / old_peak:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
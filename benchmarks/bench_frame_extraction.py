@@ -0,0 +1,70 @@
+"""
+Compare per-timestamp seeking against the single-pass screenshot extraction.
+
+Generates a synthetic video locally (no download needed), captures the same
+timestamps with the old `capture_screenshot` loop and with
+`process_screenshots`, and prints the wall-clock time of each.
+
+    python benchmarks/bench_frame_extraction.py --minutes 10 --screenshots 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from captions import ms_to_timestamp
+from script_02 import capture_screenshot, process_screenshots
+from synthetic_media import write_video
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=10, help="Length of the generated video")
+    parser.add_argument("--screenshots", type=int, default=20, help="Number of timestamps to capture")
+    parser.add_argument("--video", help="Use an existing video instead of generating one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        video_path = args.video
+        if video_path is None:
+            video_path = os.path.join(work_dir, "synthetic.mp4")
+            start = time.perf_counter()
+            write_video(video_path, args.minutes)
+            print(f"Generated {args.minutes:g} min test video in {time.perf_counter() - start:.1f}s")
+
+        cap = cv2.VideoCapture(video_path)
+        duration_ms = cap.get(cv2.CAP_PROP_FRAME_COUNT) / (cap.get(cv2.CAP_PROP_FPS) or 30) * 1000
+        cap.release()
+        step = duration_ms / (args.screenshots + 1)
+        timestamps = [ms_to_timestamp(int(step * (i + 1)), None) for i in range(args.screenshots)]
+
+        per_seek_dir = os.path.join(work_dir, "per_seek")
+        single_pass_dir = os.path.join(work_dir, "single_pass")
+        os.makedirs(per_seek_dir)
+        os.makedirs(single_pass_dir)
+
+        start = time.perf_counter()
+        for timestamp in timestamps:
+            capture_screenshot(video_path, timestamp,
+                               os.path.join(per_seek_dir, f"screenshot_{timestamp.replace(':', '_')}.png"))
+        per_seek = time.perf_counter() - start
+
+        start = time.perf_counter()
+        process_screenshots(video_path, timestamps, single_pass_dir)
+        single_pass = time.perf_counter() - start
+
+    print("\n==== Frame Extraction Timing ====")
+    print(f"Screenshots: {len(timestamps)}")
+    print(f"Open + seek per timestamp: {per_seek:.2f}s ({per_seek / len(timestamps) * 1000:.0f} ms/frame)")
+    print(f"Single pass:               {single_pass:.2f}s ({single_pass / len(timestamps) * 1000:.0f} ms/frame)")
+    print(f"Speedup: {per_seek / single_pass:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Benchmark the whole transcript -> blog -> screenshots -> docx pipeline offline.
+
+For each transcript length, writes a synthetic transcript and slides video
+(benchmarks/synthetic_media.py), swaps the Flash and Pro models of script_01
+for FakeChatModel (a fixed latency per call plus optional output-token
+time), and runs blog generation, screenshot capture and Word conversion.
+Prints end-to-end throughput and the latency of every instrumented stage,
+taken from the same spans `TRACE_DIR` traces record, so changes to batching,
+caption slicing or frame extraction show up as numbers. `--stream` runs the
+asyncio pipeline of stream_pipeline.py instead, with the generated video as
+VIDEO_SOURCE, so screenshots are captured while sections stream.
+`--planning segments` plans sections from local topic segments
+(PLANNING_MODE) instead of Pro calls per caption batch. `--output`
+saves the results as JSON for comparing runs.
+
+    python benchmarks/bench_pipeline.py --minutes 10 60 600 --latency 0.2
+    python benchmarks/bench_pipeline.py --minutes 60 --latency 1 --output-tps 100 --stream
+    python benchmarks/bench_pipeline.py --minutes 60 600 --planning segments
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.globals import set_llm_cache
+
+import script_01
+import script_02
+from captions import CaptionIndex, load_captions
+from config import CAPTION_NORMALIZATION, LLM_RATE_LIMITS, TRACE_DIR
+from fake_chat_model import FakeChatModel
+from instrumentation import start_trace
+from llm_client import governed
+from script_02 import extract_timestamps, screenshot_targets, process_screenshots, inject_screenshots_to_markdown
+from script_03 import build_word_document
+from stream_pipeline import stream_blog
+from synthetic_media import write_transcript, write_video
+
+
+def install_fake_models(args):
+    """Replace the models used by script_01's chains; returns the fakes keyed by the model they replace."""
+    fakes = {}
+    for attribute, name in (("flash_llm", "gemini-1.5-flash"), ("pro_llm", "gemini-1.5-pro")):
+        fake = FakeChatModel(model_name=f"fake-{name}", latency=args.latency,
+                             output_tokens_per_second=args.output_tps, response_words=args.response_words,
+                             callbacks=[script_01.llm_trace_handler])
+        fakes[name] = fake
+        if args.rate_limits and name in LLM_RATE_LIMITS:
+            fake = governed(fake, f"fake-{name}", LLM_RATE_LIMITS[name])
+        setattr(script_01, attribute, fake)
+    script_01.setup_llm()
+    # Fake responses must neither come from nor end up in the real response cache
+    set_llm_cache(None)
+    return fakes
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0
+
+
+def summarize_spans(events):
+    """Group completed spans by name into count, total, median and p95 latency in ms."""
+    durations = {}
+    for event in events:
+        if event["ph"] == "X":
+            durations.setdefault(event["name"], []).append(event["dur"] / 1000)
+    return {
+        name: {"count": len(values), "total_ms": round(sum(values), 1),
+               "p50_ms": round(percentile(values, 0.5), 1), "p95_ms": round(percentile(values, 0.95), 1)}
+        for name, values in durations.items()
+    }
+
+
+def run_pipeline(minutes, work_dir, tracer, fakes, args):
+    """Generate inputs for one transcript length, run every stage and return its measurements."""
+    job_dir = os.path.join(work_dir, f"{minutes:g}min")
+    screenshots_dir = os.path.join(job_dir, "screenshots")
+    os.makedirs(screenshots_dir)
+    transcript = os.path.join(job_dir, f"transcript.{args.format}")
+    video = os.path.join(job_dir, "video.mp4")
+    blog_markdown = os.path.join(job_dir, "generated_blog.md")
+    final_markdown = os.path.join(job_dir, "final_blog.md")
+
+    start = time.perf_counter()
+    captions = write_transcript(transcript, minutes)
+    frames = write_video(video, minutes, fps=args.video_fps, width=args.video_width,
+                         height=args.video_width * 9 // 16, style="slides") if not args.no_video else 0
+    print(f"\nGenerated {minutes:g} min transcript ({captions} captions) and video ({frames} frames) "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    calls_before = {name: fake.calls for name, fake in fakes.items()}
+    first_event = len(tracer.events())
+    stages = {}
+    output = sys.stdout if args.verbose else open(os.devnull, 'w')
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        if args.stream and not args.no_video:
+            # Blog and screenshots overlap, so they are timed as one stage
+            video_source, script_02.VIDEO_SOURCE = script_02.VIDEO_SOURCE, video
+            try:
+                stage_start = time.perf_counter()
+                asyncio.run(stream_blog(transcript, None, blog_markdown, final_markdown, screenshots_dir,
+                                        output_json=os.path.join(job_dir, "blog_outline.json"),
+                                        checkpoint_dir=os.path.join(job_dir, "checkpoints")))
+                stages["blog+screenshots"] = time.perf_counter() - stage_start
+            finally:
+                script_02.VIDEO_SOURCE = video_source
+        else:
+            stage_start = time.perf_counter()
+            script_01.generate_blog(transcript, output_markdown=blog_markdown,
+                                    output_json=os.path.join(job_dir, "blog_outline.json"),
+                                    checkpoint_dir=os.path.join(job_dir, "checkpoints"))
+            stages["blog"] = time.perf_counter() - stage_start
+
+            if not args.no_video:
+                # Screenshots at the section starts; "scene" selection would scan YouTube
+                stage_start = time.perf_counter()
+                timestamps = extract_timestamps(blog_markdown)
+                if '00:00:00' not in timestamps:
+                    timestamps.insert(0, '00:00:00')
+                targets = screenshot_targets(timestamps, CaptionIndex(load_captions(transcript, CAPTION_NORMALIZATION)))
+                screenshot_paths = process_screenshots(video, timestamps, screenshots_dir, targets=targets)
+                inject_screenshots_to_markdown(blog_markdown, final_markdown, screenshot_paths)
+                stages["screenshots"] = time.perf_counter() - stage_start
+            else:
+                final_markdown = blog_markdown
+
+        stage_start = time.perf_counter()
+        # The entry point of `cli.py all` and batch_runner; every job directory is new, so it always converts
+        build_word_document(final_markdown, os.path.join(job_dir, Path(final_markdown).stem + '.docx'))
+        stages["docx"] = time.perf_counter() - stage_start
+    elapsed = time.perf_counter() - start
+    if output is not sys.stdout:
+        output.close()
+
+    events = tracer.events()[first_event:]
+    frames_decoded = sum(event["args"].get("frames_decoded", 0) for event in events
+                         if event["name"] == "process_screenshots")
+    return {
+        "minutes": minutes,
+        "captions": captions,
+        "video_frames": frames,
+        "seconds": round(elapsed, 3),
+        "stages": {name: round(seconds, 3) for name, seconds in stages.items()},
+        "llm_calls": {name: fake.calls - calls_before[name] for name, fake in fakes.items()},
+        "frames_decoded": frames_decoded,
+        "spans": summarize_spans(events),
+    }
+
+
+def print_result(result):
+    minutes, seconds = result["minutes"], result["seconds"]
+    print(f"==== {minutes:g} min transcript ====")
+    print(f"End to end: {seconds:.2f}s ({minutes * 60 / seconds:.0f}x realtime, "
+          f"{result['captions'] / seconds:.0f} captions/s)")
+    print("Stages: " + ", ".join(f"{name} {stage_seconds:.2f}s" for name, stage_seconds in result["stages"].items()))
+    print("LLM calls: " + ", ".join(f"{name} {calls}" for name, calls in result["llm_calls"].items()))
+    if result["stages"].get("screenshots"):
+        print(f"Frames decoded: {result['frames_decoded']} "
+              f"({result['frames_decoded'] / result['stages']['screenshots']:.0f} frames/s)")
+    print(f"{'span':24s} {'count':>6s} {'total s':>9s} {'p50 ms':>9s} {'p95 ms':>9s}")
+    for name, stats in sorted(result["spans"].items(), key=lambda item: -item[1]["total_ms"]):
+        print(f"{name:24s} {stats['count']:6d} {stats['total_ms'] / 1000:9.2f} "
+              f"{stats['p50_ms']:9.1f} {stats['p95_ms']:9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, nargs="+", default=[10, 60, 600],
+                        help="Transcript lengths to benchmark, in minutes")
+    parser.add_argument("--format", choices=("srt", "vtt"), default="srt", help="Transcript format")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per fake LLM call")
+    parser.add_argument("--output-tps", type=float, help="Fake output tokens per second, added to the latency")
+    parser.add_argument("--response-words", type=int, default=300, help="Words per fake section or summary")
+    parser.add_argument("--rate-limits", action="store_true",
+                        help="Pace the fake models through llm_client with the LLM_RATE_LIMITS of the real ones")
+    parser.add_argument("--video-fps", type=float, default=2, help="Frame rate of the generated videos")
+    parser.add_argument("--video-width", type=int, default=320, help="Width of the generated videos (16:9)")
+    parser.add_argument("--no-video", action="store_true", help="Skip the video and screenshot stage")
+    parser.add_argument("--stream", action="store_true",
+                        help="Run stream_pipeline.py, capturing screenshots while sections stream")
+    parser.add_argument("--planning", choices=("llm", "segments"), default="llm",
+                        help="PLANNING_MODE: Pro calls per caption batch, or local topic segments titled by Flash")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own output")
+    args = parser.parse_args()
+
+    tracer = start_trace("bench_pipeline", TRACE_DIR or tempfile.gettempdir())
+    fakes = install_fake_models(args)
+    script_01.PLANNING_MODE = args.planning
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for minutes in args.minutes:
+            results.append(run_pipeline(minutes, work_dir, tracer, fakes, args))
+            print_result(results[-1])
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Compare bare Gemini calls with calls paced by llm_client against a throttling fake API.
+
+Starts benchmarks/fake_gemini_server.py locally, fires the same burst of
+concurrent requests through a plain ChatGoogleGenerativeAI model (its own
+retries only) and through `llm_client.governed`, and prints completed and
+failed calls, 429s returned by the server, wall-clock time and latency.
+
+    python benchmarks/bench_rate_limiter.py --calls 60 --threads 16 --rpm 120 --max-concurrent 4
+"""
+import argparse
+import concurrent.futures
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from fake_gemini_server import FakeGeminiServer
+from llm_client import governed
+
+
+def run_burst(model, calls, threads):
+    """Invoke the model `calls` times from `threads` threads; return (latencies, failures, seconds)."""
+    def call(i):
+        start = time.perf_counter()
+        model.invoke(f"Request {i}: summarize this transcript part. " * 20)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies, failures = [], 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+        for future in [executor.submit(call, i) for i in range(calls)]:
+            try:
+                latencies.append(future.result())
+            except Exception:
+                failures += 1
+    return latencies, failures, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=60)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--rpm", type=int, default=120, help="Server quota, also used as the client limit")
+    parser.add_argument("--max-concurrent", type=int, default=4, help="Server concurrency cap")
+    parser.add_argument("--delay", type=float, default=0.3, help="Seconds per accepted request")
+    parser.add_argument("--throttle-rate", type=float, default=0.02, help="Probability of a random 429")
+    parser.add_argument("--deadline", type=float, default=120, help="Per-call deadline of the governed model")
+    args = parser.parse_args()
+
+    results = {}
+    for name in ("bare", "governed"):
+        # A fresh server per run, so quotas used by one run do not throttle the next
+        server = FakeGeminiServer(rpm=args.rpm, max_concurrent=args.max_concurrent, delay=args.delay,
+                                  throttle_rate=args.throttle_rate).start()
+        model = ChatGoogleGenerativeAI(model="gemini-1.5-flash", google_api_key="fake", base_url=server.url,
+                                       timeout=60, max_retries=2)
+        if name == "governed":
+            model = governed(model, f"bench-{server.server_address[1]}", {"rpm": args.rpm, "tpm": 10 ** 9},
+                             deadline_seconds=args.deadline)
+        latencies, failures, seconds = run_burst(model, args.calls, args.threads)
+        server.shutdown()
+        results[name] = (latencies, failures, seconds, server.throttled, server.peak_concurrency,
+                         model.governor.stats() if name == "governed" else None)
+
+    print("\n==== Rate Limiting Against Fake Gemini ====")
+    print(f"{args.calls} calls from {args.threads} threads; server: {args.rpm} rpm, "
+          f"{args.max_concurrent} concurrent, {args.delay}s per call, {args.throttle_rate:.0%} random 429s")
+    for name, (latencies, failures, seconds, throttled, peak, stats) in results.items():
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+        print(f"{name:9s} completed {len(latencies):3d}  failed {failures:3d}  429s {throttled:4d}  "
+              f"wall {seconds:6.1f}s  p95 latency {p95:5.1f}s  peak server concurrency {peak}")
+        if stats:
+            print(f"          governor: {stats['retries']} retries, final concurrency limit {stats['concurrency_limit']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Deterministic stand-in for the Gemini chat models, for offline benchmarks.
+
+`FakeChatModel` plugs into the same LangChain chains as ChatGoogleGenerativeAI.
+Planning prompts (those asking for the `"outline"` JSON) are answered with a
+schema-valid `BlogOutline` that splits the timestamped transcript segment into
+sections, and topic segment prompts get a JSON title and summary; section
+prompts get a `## [start - end] Title` heading followed by generated prose,
+and every other prompt gets prose alone. Each call sleeps for a fixed latency plus its output tokens at a given rate, so
+concurrency, batching and token volume show up in wall-clock time without any
+network traffic. Streamed calls (`astream`) deliver the first chunk after the
+latency and the rest of the response at the output rate.
+"""
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from typing import Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from batch_planner import estimate_tokens
+from captions import ms_to_timestamp, timestamp_to_ms
+
+_CAPTION_RANGE = re.compile(r'\[(\d+:\d{2}:\d{2}[.,]\d{3}) - (\d+:\d{2}:\d{2}[.,]\d{3})\]')
+_SECTION_PLAN = re.compile(r'\{"title": .*?"end_time": "[^"]*"\}')
+
+WORDS = (
+    "model data pipeline latency section video transcript speaker example system design memory cache "
+    "request batch token frame scene summary outline detail result question answer approach trade-off "
+    "performance throughput budget error retry deadline concurrency benchmark measure improve explain"
+).split()
+
+
+def fake_prose(rng, words):
+    """Return about `words` words of markdown prose: paragraphs with bold terms and a short list."""
+    paragraphs = []
+    remaining = words
+    while remaining > 0:
+        length = min(remaining, rng.randint(40, 80))
+        tokens = [rng.choice(WORDS) for _ in range(length)]
+        tokens[rng.randrange(length)] = f"**{rng.choice(WORDS)}**"
+        paragraphs.append(" ".join(tokens).capitalize() + ".")
+        remaining -= length
+    paragraphs.insert(min(1, len(paragraphs)), "\n".join(
+        f"- {rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} {rng.choice(WORDS)}" for _ in range(3)))
+    return "\n\n".join(paragraphs)
+
+
+def fake_outline(prompt, rng, section_seconds, summary_words):
+    """Split the caption range of a planning prompt into sections of about `section_seconds`."""
+    ranges = _CAPTION_RANGE.findall(prompt)
+    if not ranges:
+        return {"outline": []}
+    start_ms, end_ms = timestamp_to_ms(ranges[0][0]), timestamp_to_ms(ranges[-1][1])
+    count = max(1, round((end_ms - start_ms) / (section_seconds * 1000)))
+    step = (end_ms - start_ms) / count
+    outline = []
+    for i in range(count):
+        outline.append({
+            "title": " ".join(rng.choice(WORDS) for _ in range(4)).title(),
+            "summary": " ".join(rng.choice(WORDS) for _ in range(summary_words)).capitalize() + ".",
+            "start_time": ms_to_timestamp(start_ms + i * step, None),
+            "end_time": ms_to_timestamp(start_ms + (i + 1) * step, None),
+        })
+    return {"outline": outline}
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model that answers from the prompt alone, after a simulated delay.
+
+    Responses depend only on the prompt, so repeated runs produce the same
+    blog. Counters (`calls`, `prompt_chars`, `output_chars`) cover every call
+    made through the model.
+    """
+
+    model_name: str = "fake-gemini"
+    latency: float = 0.2
+    output_tokens_per_second: Optional[float] = None
+    response_words: int = 300
+    section_seconds: float = 300
+    summary_words: int = 60
+    calls: int = 0
+    prompt_chars: int = 0
+    output_chars: int = 0
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self):
+        return "fake-chat-model"
+
+    @property
+    def _identifying_params(self):
+        return {"model_name": self.model_name}
+
+    def respond(self, prompt):
+        """Return the response text for a prompt, without the simulated delay."""
+        rng = random.Random(zlib.crc32(prompt.encode('utf-8')))
+        if '"outline"' in prompt:
+            outline = fake_outline(prompt, rng, self.section_seconds, self.summary_words)
+            return f"```json\n{json.dumps(outline, indent=2)}\n```"
+        if "Transcript Segment:" in prompt:
+            # Segment prompts (PLANNING_MODE = "segments") ask for a title and summary only
+            summary = {"title": " ".join(rng.choice(WORDS) for _ in range(4)).title(),
+                       "summary": " ".join(rng.choice(WORDS) for _ in range(self.summary_words)).capitalize() + "."}
+            return f"```json\n{json.dumps(summary, indent=2)}\n```"
+        plan = _SECTION_PLAN.search(prompt)
+        if plan:
+            # Section prompts ask for the timestamped heading screenshots are matched to
+            section = json.loads(plan.group(0))
+            heading = f"## [{section['start_time']} - {section['end_time']}] {section['title']}"
+            return f"{heading}\n\n{fake_prose(rng, self.response_words)}"
+        return fake_prose(rng, self.response_words)
+
+    def _answer(self, messages):
+        """Return (text, usage metadata, output seconds) of a call and count it."""
+        prompt = "\n".join(str(message.content) for message in messages)
+        text = self.respond(prompt)
+        prompt_tokens, output_tokens = estimate_tokens(len(prompt)), estimate_tokens(len(text))
+        with self._lock:
+            self.calls += 1
+            self.prompt_chars += len(prompt)
+            self.output_chars += len(text)
+        usage = {"input_tokens": prompt_tokens, "output_tokens": output_tokens,
+                 "total_tokens": prompt_tokens + output_tokens}
+        output_seconds = output_tokens / self.output_tokens_per_second if self.output_tokens_per_second else 0
+        return text, usage, output_seconds
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        # Accepts and ignores per-call options such as timeout and max_retries
+        text, usage, output_seconds = self._answer(messages)
+        time.sleep(self.latency + output_seconds)
+        message = AIMessage(content=text, usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        text, usage, output_seconds = self._answer(messages)
+        await asyncio.sleep(self.latency)
+        # 20 chunks of equal length; like API chunks they may cut a heading in two
+        size = max(1, -(-len(text) // 20))
+        parts = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        for i, part in enumerate(parts):
+            if i:
+                await asyncio.sleep(output_seconds / len(parts))
+            last = i == len(parts) - 1
+            chunk = AIMessageChunk(content=part, usage_metadata=usage if last else None)
+            if run_manager:
+                await run_manager.on_llm_new_token(part, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
@@ -0,0 +1,153 @@
+"""
+Local stand-in for the Gemini `generateContent` REST endpoint.
+
+Answers every request after a configurable delay and returns 429
+RESOURCE_EXHAUSTED when a per-model requests-per-minute quota or concurrency
+cap is exceeded, or at random with a given probability. Point
+ChatGoogleGenerativeAI at it with `base_url=server.url` to exercise rate
+limiting, retries and deadlines offline.
+
+    python benchmarks/fake_gemini_server.py --port 8765 --rpm 60 --max-concurrent 4 --delay 0.5
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_MODEL_PATH = re.compile(r'/models/([^/:]+):generateContent')
+
+
+class FakeGeminiServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server imitating Gemini quotas.
+
+    Args:
+        port: Port to listen on (0 picks a free one)
+        rpm: Requests per minute accepted per model, over a sliding window
+        max_concurrent: Requests processed at once per model before answering 429
+        delay: Seconds each accepted request takes (plus up to `jitter`)
+        throttle_rate: Probability of a random 429 for an otherwise accepted request
+        response_text: Text returned by the model, or None to echo the prompt size
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port=0, rpm=60, max_concurrent=4, delay=0.5, jitter=0.2, throttle_rate=0.0,
+                 response_text=None, seed=0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.rpm = rpm
+        self.max_concurrent = max_concurrent
+        self.delay = delay
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.response_text = response_text
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recent = {}  # model -> deque of accepted request times
+        self._active = {}  # model -> requests in progress
+        self.accepted = 0
+        self.throttled = 0
+        self.peak_concurrency = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        """Serve on a background thread and return self."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def admit(self, model):
+        """Return True and count the request as active, or False if it should get a 429."""
+        with self._lock:
+            now = time.monotonic()
+            recent = self._recent.setdefault(model, deque())
+            while recent and now - recent[0] > 60:
+                recent.popleft()
+            active = self._active.get(model, 0)
+            if len(recent) >= self.rpm or active >= self.max_concurrent or self._random.random() < self.throttle_rate:
+                self.throttled += 1
+                return False
+            recent.append(now)
+            self._active[model] = active + 1
+            self.accepted += 1
+            self.peak_concurrency = max(self.peak_concurrency, active + 1)
+            return True
+
+    def finish(self, model):
+        with self._lock:
+            self._active[model] -= 1
+
+    def processing_time(self):
+        with self._lock:
+            return self.delay + self._random.uniform(0, self.jitter)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        match = _MODEL_PATH.search(self.path)
+        if not match:
+            self._send_json(404, {"error": {"code": 404, "message": f"Unknown path {self.path}", "status": "NOT_FOUND"}})
+            return
+        model = match.group(1)
+        server = self.server
+        if not server.admit(model):
+            self._send_json(429, {"error": {"code": 429, "message": "Resource has been exhausted (e.g. check quota).",
+                                            "status": "RESOURCE_EXHAUSTED"}})
+            return
+        try:
+            time.sleep(server.processing_time())
+            prompt_chars = sum(len(part.get("text", "")) for content in request.get("contents", [])
+                               for part in content.get("parts", []))
+            text = server.response_text or f"Fake {model} response to a {prompt_chars}-character prompt."
+            prompt_tokens, output_tokens = -(-prompt_chars // 4), -(-len(text) // 4)
+            self._send_json(200, {
+                "candidates": [{
+                    "content": {"role": "model", "parts": [{"text": text}]},
+                    "finishReason": "STOP",
+                    "index": 0,
+                }],
+                "usageMetadata": {
+                    "promptTokenCount": prompt_tokens,
+                    "candidatesTokenCount": output_tokens,
+                    "totalTokenCount": prompt_tokens + output_tokens,
+                },
+                "modelVersion": model,
+            })
+        finally:
+            server.finish(model)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rpm", type=int, default=60, help="Requests per minute accepted per model")
+    parser.add_argument("--max-concurrent", type=int, default=4, help="Concurrent requests per model before 429")
+    parser.add_argument("--delay", type=float, default=0.5, help="Seconds per accepted request")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Probability of a random 429")
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(args.port, args.rpm, args.max_concurrent, args.delay, throttle_rate=args.throttle_rate)
+    print(f"Fake Gemini API listening on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
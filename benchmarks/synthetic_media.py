@@ -0,0 +1,82 @@
+"""
+Generate transcripts and videos for offline benchmarks.
+
+Transcripts are SRT or VTT files of rolling captions (a few seconds each, at
+a normal speaking rate, with occasional pauses) of any length. Videos are
+written with OpenCV, either as changing noise (every frame differs) or as
+slides that change every few seconds like a screen-shared talk.
+"""
+import os
+import random
+
+import cv2
+import numpy as np
+
+from captions import ms_to_timestamp
+from fake_chat_model import WORDS
+
+
+def write_transcript(path, minutes, words_per_second=2.5, pause_rate=0.05, seed=0):
+    """
+    Write a transcript covering `minutes` minutes; the format follows the extension (.srt or .vtt).
+
+    Returns:
+        Number of captions written
+    """
+    vtt = os.path.splitext(path)[1].lower() == '.vtt'
+    rng = random.Random(seed)
+    end_of_talk = minutes * 60 * 1000
+    start_ms, count = 0, 0
+    with open(path, 'w', encoding='utf-8') as f:
+        if vtt:
+            f.write("WEBVTT\n\n")
+        while start_ms < end_of_talk:
+            duration = rng.randint(2000, 5000)
+            end_ms = min(start_ms + duration, end_of_talk)
+            text = " ".join(rng.choice(WORDS) for _ in range(max(1, round(duration / 1000 * words_per_second))))
+            count += 1
+            if vtt:
+                f.write(f"{ms_to_timestamp(start_ms, '.')} --> {ms_to_timestamp(end_ms, '.')}\n{text}\n\n")
+            else:
+                f.write(f"{count}\n{ms_to_timestamp(start_ms)} --> {ms_to_timestamp(end_ms)}\n{text}\n\n")
+            # Speakers pause now and then; the batch planner prefers to cut there
+            start_ms = end_ms + (rng.randint(1500, 4000) if rng.random() < pause_rate else 0)
+    return count
+
+
+def write_video(path, minutes, fps=15, width=640, height=360, style="noise", slide_seconds=30):
+    """
+    Write an mp4 video of `minutes` minutes.
+
+    Args:
+        style: "noise" moves a noise texture every frame (worst case for encoders
+            and frame comparison); "slides" shows a still slide that changes every
+            `slide_seconds`, with only a small clock moving in between
+
+    Returns:
+        Number of frames written
+    """
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    rng = np.random.default_rng(0)
+    frames = int(minutes * 60 * fps)
+    if style == "noise":
+        background = rng.integers(0, 255, (height * 2, width * 2, 3), dtype=np.uint8)
+    slide, slide_index = None, -1
+    for i in range(frames):
+        if style == "noise":
+            y, x = i % height, (i * 3) % width
+            frame = background[y:y + height, x:x + width].copy()
+            cv2.putText(frame, f"frame {i}", (20, 60), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 255), 3)
+        else:
+            if i // int(slide_seconds * fps) != slide_index:
+                slide_index = i // int(slide_seconds * fps)
+                slide = np.full((height, width, 3), 235, dtype=np.uint8)
+                slide[height // 2:] = rng.integers(0, 255, (height - height // 2, width, 3), dtype=np.uint8)
+                cv2.putText(slide, f"Slide {slide_index}", (width // 16, height // 4), cv2.FONT_HERSHEY_SIMPLEX,
+                            height / 240, (30, 30, 30), max(1, height // 120))
+            frame = slide.copy()
+            cv2.putText(frame, ms_to_timestamp(i * 1000 / fps, None), (width - width // 4, height // 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, height / 720, (30, 30, 30), 1)
+        writer.write(frame)
+    writer.release()
+    return frames
@@ -0,0 +1,403 @@
+import heapq
+import html
+import io
+import os
+import re
+import string
+from array import array
+from bisect import bisect_left, bisect_right
+
+_TIMESTAMP_PATTERN = re.compile(r'^\s*(?:(\d+):)?(\d{1,2}):(\d{1,2})(?:[.,](\d{1,3}))?\s*$')
+_CUE_TAG_PATTERN = re.compile(r'<[^>]*>')
+_VTT_BLOCK_KEYWORDS = ('NOTE', 'STYLE', 'REGION')
+_SENTENCE_END = ('.', '?', '!', '…')
+
+# Rolling captions repeat at most a line or two of the previous cue
+_OVERLAP_WINDOW_WORDS = 64
+
+# Cues this short only repeat the screen of rolling captions
+_ROLLING_CUE_MS = 50
+
+# Cues listed out of start order are expected within this many positions of their place
+_REORDER_WINDOW_CUES = 64
+
+
+def timestamp_to_ms(timestamp):
+    """
+    Convert a caption or section timestamp to integer milliseconds.
+
+    Accepts `HH:MM:SS`, `HH:MM:SS,mmm` (SRT), `HH:MM:SS.mmm` (VTT) and `MM:SS[.mmm]`.
+
+    Args:
+        timestamp: Timestamp string
+
+    Returns:
+        Milliseconds as int
+
+    Raises:
+        ValueError: If the timestamp cannot be parsed
+    """
+    match = _TIMESTAMP_PATTERN.match(str(timestamp))
+    if not match:
+        raise ValueError(f"Invalid timestamp: {timestamp!r}")
+    hours, minutes, seconds, fraction = match.groups()
+    ms = int((fraction or '0').ljust(3, '0'))
+    return ((int(hours or 0) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + ms
+
+
+def ms_to_timestamp(ms, ms_separator=','):
+    """Format milliseconds as `HH:MM:SS,mmm` (or `HH:MM:SS` when ms_separator is None)."""
+    seconds, ms = divmod(int(ms), 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    if ms_separator is None:
+        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{ms_separator}{ms:03d}"
+
+
+class CaptionStore:
+    """
+    Columnar, append-only caption storage.
+
+    Start and end times live in int32 millisecond arrays and all caption text
+    lives in one string buffer, with an int64 offset array marking where each
+    caption begins. Captions are separated by a single space in the buffer, so
+    the joined text of any caption range is a single slice.
+    """
+
+    def __init__(self, ms_separator=','):
+        self.ms_separator = ms_separator  # ',' for SRT-style, '.' for VTT-style timestamps
+        self.starts = array('i')
+        self.ends = array('i')
+        self.offsets = array('q', [0])
+        self._writer = io.StringIO()
+        self._buffer = ""
+        self._dirty = False
+
+    def __len__(self):
+        return len(self.starts)
+
+    def append(self, start_ms, end_ms, text):
+        """Append one caption; text is stripped and flattened to a single line."""
+        text = " ".join(text.split())
+        self.starts.append(start_ms)
+        self.ends.append(end_ms)
+        self._writer.write(text)
+        self._writer.write(" ")
+        self.offsets.append(self.offsets[-1] + len(text) + 1)
+        self._dirty = True
+
+    @property
+    def buffer(self):
+        if self._dirty:
+            self._buffer = self._writer.getvalue()
+            self._dirty = False
+        return self._buffer
+
+    def _bounds(self, lo, hi):
+        hi = len(self) if hi is None else hi
+        return lo, max(lo, hi)
+
+    def text(self, i):
+        """Return the text of caption i."""
+        return self.buffer[self.offsets[i]:self.offsets[i + 1] - 1]
+
+    def text_length(self, lo=0, hi=None):
+        """Return the number of text characters in captions [lo, hi), separators excluded."""
+        lo, hi = self._bounds(lo, hi)
+        return self.offsets[hi] - self.offsets[lo] - (hi - lo)
+
+    def joined_text(self, lo=0, hi=None):
+        """Return the space-joined text of captions [lo, hi)."""
+        lo, hi = self._bounds(lo, hi)
+        if hi == lo:
+            return ""
+        return self.buffer[self.offsets[lo]:self.offsets[hi] - 1]
+
+    def format_time(self, ms):
+        return ms_to_timestamp(ms, self.ms_separator)
+
+    def timestamped_text(self, lo=0, hi=None):
+        """Return captions [lo, hi) as `[start - end] text` lines."""
+        lo, hi = self._bounds(lo, hi)
+        buffer, offsets = self.buffer, self.offsets
+        return "".join(
+            f"[{self.format_time(self.starts[i])} - {self.format_time(self.ends[i])}] "
+            f"{buffer[offsets[i]:offsets[i + 1] - 1]}\n"
+            for i in range(lo, hi)
+        )
+
+    def cues(self):
+        """Iterate over (start_ms, end_ms, text) for every caption."""
+        buffer, offsets = self.buffer, self.offsets
+        for i in range(len(self)):
+            yield self.starts[i], self.ends[i], buffer[offsets[i]:offsets[i + 1] - 1]
+
+    def sorted_by_start(self):
+        """Return this store if it is ordered by start time, otherwise a sorted copy."""
+        starts = self.starts
+        if all(starts[i] <= starts[i + 1] for i in range(len(starts) - 1)):
+            return self
+        ordered = CaptionStore(self.ms_separator)
+        for i in sorted(range(len(self)), key=starts.__getitem__):
+            ordered.append(self.starts[i], self.ends[i], self.text(i))
+        return ordered
+
+
+def _parse_timing_line(line):
+    """Parse `start --> end [cue settings]` into (start_ms, end_ms), or None if it is not a timing line."""
+    start, arrow, rest = line.partition('-->')
+    fields = rest.split()
+    if not arrow or not fields:
+        return None
+    try:
+        return timestamp_to_ms(start.strip()), timestamp_to_ms(fields[0])
+    except ValueError:
+        return None
+
+
+def _cue_text(segments, vtt):
+    """Join a cue's blank-line separated segments into its lines, dropping VTT NOTE/STYLE/REGION blocks."""
+    parts = []
+    for segment in segments:
+        if vtt and segment and segment[0].startswith(_VTT_BLOCK_KEYWORDS):
+            continue
+        for line in segment:
+            parts.append(_CUE_TAG_PATTERN.sub('', line) if vtt else line)
+    return "\n".join(parts)
+
+
+def iter_cues(lines, vtt=False):
+    """
+    Stream (start_ms, end_ms, text) cues from SRT or VTT lines; text keeps the cue's line breaks.
+
+    A cue starts at each `-->` timing line and runs until the next one. Auto
+    captions often contain whitespace-only lines inside a cue, so blank lines
+    only split the cue into segments; the segment directly before the next
+    timing line is that cue's number or identifier and is dropped.
+
+    Args:
+        lines: Iterable of lines, e.g. an open file
+        vtt: Strip cue tags and skip NOTE/STYLE/REGION blocks
+    """
+    timing = None
+    segments = [[]]
+    for line in lines:
+        line = line.rstrip('\r\n').lstrip('\ufeff')
+        next_timing = _parse_timing_line(line) if '-->' in line else None
+        if next_timing is not None:
+            if timing is not None:
+                yield timing[0], timing[1], _cue_text(segments[:-1] if len(segments) > 1 else segments, vtt)
+            timing = next_timing
+            segments = [[]]
+        elif not line.strip():
+            if segments[-1]:
+                segments.append([])
+        elif timing is not None:
+            segments[-1].append(line)
+    if timing is not None:
+        yield timing[0], timing[1], _cue_text(segments, vtt)
+
+
+def _ordered_by_start(cues, window=_REORDER_WINDOW_CUES):
+    """
+    Re-order a cue stream by start time, holding at most `window` cues.
+
+    Cues with the same start keep their order. Raises ValueError when a cue
+    starts before one that was already yielded, i.e. it was listed more than
+    `window` cues away from its place.
+    """
+    pending = []
+    last_start = None
+    for position, cue in enumerate(cues):
+        if last_start is not None and cue[0] < last_start:
+            raise ValueError(f"Cue at {cue[0]} ms is more than {window} cues out of order")
+        heapq.heappush(pending, (cue[0], position, cue))
+        if len(pending) > window:
+            last_start, _, ordered = heapq.heappop(pending)
+            yield ordered
+    while pending:
+        yield heapq.heappop(pending)[2]
+
+
+def _word_key(word):
+    return word.lower().strip(string.punctuation)
+
+
+def _overlap_length(tail, words):
+    """
+    Length of the longest suffix of `tail` that is also a prefix of `words`.
+
+    Knuth-Morris-Pratt over the word lists, O(len(tail) + len(words)).
+    """
+    m = len(words)
+    if not m or not tail:
+        return 0
+    failure = [0] * m
+    k = 0
+    for i in range(1, m):
+        while k and words[i] != words[k]:
+            k = failure[k - 1]
+        if words[i] == words[k]:
+            k += 1
+        failure[i] = k
+    k = 0
+    for word in tail:
+        while k and (k == m or word != words[k]):
+            k = failure[k - 1]
+        if word == words[k]:
+            k += 1
+    return k
+
+
+def normalize_cues(cues, min_chars=60, max_chars=240, max_gap_ms=1000, min_overlap_words=2):
+    """
+    Remove rolling-caption repetition and merge short cues into sentence-sized units.
+
+    YouTube auto captions show each line twice: every cue repeats the line
+    before it, and zero-length cues repeat the whole screen. For each cue,
+    inline tags and HTML entities are removed. Only a rolling cue (one whose
+    first line is the previous cue's last line, that lasts under
+    _ROLLING_CUE_MS, or that starts before the previous cue ends) has the
+    longest run of words that ends the text so far and starts the cue
+    dropped (compared case-insensitively without punctuation). Runs shorter
+    than `min_overlap_words` are kept unless they are the whole cue, so a
+    speaker repeating a single word is not lost. Cues of clean transcripts
+    are never rolling, so their repetitions are all kept and the cues are
+    only merged. The remaining words are merged into
+    units that end at a sentence once they reach `min_chars`, never exceed
+    `max_chars`, and never bridge a pause longer than `max_gap_ms`. Each unit
+    spans from the start of its first cue to the end of its last one.
+
+    Args:
+        cues: Iterable of (start_ms, end_ms, text) ordered by start time; text may keep its line breaks
+
+    Yields:
+        (start_ms, end_ms, text) units
+    """
+    recent = []  # Comparison keys of the last words kept
+    previous_end, previous_line = None, None  # End and last line keys of the previous cue
+    unit_start = unit_end = None
+    unit_words = []
+    unit_chars = 0
+    for start, end, text in cues:
+        lines = [line.split() for line in html.unescape(_CUE_TAG_PATTERN.sub('', text)).splitlines() if line.strip()]
+        words = [word for line in lines for word in line]
+        keys = [_word_key(word) for word in words]
+        first_line = [_word_key(word) for word in lines[0]] if lines else []
+        rolling = (end - start < _ROLLING_CUE_MS or (previous_end is not None and start < previous_end)
+                   or (first_line and first_line == previous_line))
+        previous_end = end
+        previous_line = [_word_key(word) for word in lines[-1]] if lines else None
+        if rolling:
+            overlap = _overlap_length(recent[-len(keys):], keys)
+            if overlap == len(keys) or overlap >= min_overlap_words:
+                words = words[overlap:]
+        if not words:
+            continue
+        recent.extend(_word_key(word) for word in words)
+        del recent[:-_OVERLAP_WINDOW_WORDS]
+
+        chars = sum(len(word) + 1 for word in words) - 1
+        if unit_words and (start - unit_end > max_gap_ms or unit_chars + 1 + chars > max_chars
+                           or (unit_chars >= min_chars and unit_words[-1].endswith(_SENTENCE_END))):
+            yield unit_start, unit_end, " ".join(unit_words)
+            unit_words = []
+        if not unit_words:
+            unit_start, unit_end, unit_chars = start, end, chars
+        else:
+            unit_end = max(unit_end, end)
+            unit_chars += 1 + chars
+        unit_words.extend(words)
+    if unit_words:
+        yield unit_start, unit_end, " ".join(unit_words)
+
+
+def load_captions(path, normalization=None):
+    """
+    Stream a VTT or SRT file into a CaptionStore.
+
+    Normalization streams too: cues are re-ordered by start time within a
+    window of _REORDER_WINDOW_CUES. A file whose cues are further out of
+    order is read a second time and sorted in memory.
+
+    Args:
+        path: Path to the .vtt or .srt file
+        normalization: Keyword arguments of normalize_cues to apply after
+            parsing, or None to keep every cue as it is
+
+    Returns:
+        CaptionStore ordered by start time
+    """
+    file_extension = os.path.splitext(path)[1].lower()
+    if file_extension not in ('.vtt', '.srt'):
+        raise ValueError(f"Unsupported file type: {file_extension}. Only .vtt and .srt files are supported.")
+
+    is_vtt = file_extension == '.vtt'
+    store = CaptionStore(ms_separator='.' if is_vtt else ',')
+    with open(path, 'r', encoding='utf-8') as f:
+        if normalization is None:
+            for start_ms, end_ms, text in iter_cues(f, vtt=is_vtt):
+                store.append(start_ms, end_ms, text)
+            return store.sorted_by_start()
+
+        # Normalization needs the cues' line breaks, which the store flattens
+        try:
+            for start_ms, end_ms, text in normalize_cues(_ordered_by_start(iter_cues(f, vtt=is_vtt)),
+                                                         **normalization):
+                store.append(start_ms, end_ms, text)
+            return store
+        except ValueError:
+            f.seek(0)
+            cues = sorted(iter_cues(f, vtt=is_vtt), key=lambda cue: cue[0])
+
+    store = CaptionStore(ms_separator='.' if is_vtt else ',')
+    for start_ms, end_ms, text in normalize_cues(cues, **normalization):
+        store.append(start_ms, end_ms, text)
+    return store
+
+
+class CaptionIndex:
+    """
+    Sorted index over caption start times for O(log n) time-window lookups.
+
+    Start times are kept as milliseconds, so lookups compare numbers instead
+    of strings and work regardless of whether the query uses `HH:MM:SS` or
+    `HH:MM:SS,mmm`.
+    """
+
+    def __init__(self, store):
+        self.store = store.sorted_by_start()
+        self.starts = self.store.starts
+        self.ends = self.store.ends
+
+    def __len__(self):
+        return len(self.store)
+
+    def span(self, start, end):
+        """
+        Return the (lo, hi) index range of captions starting within [start, end].
+
+        Args:
+            start: Window start as a timestamp string or milliseconds
+            end: Window end as a timestamp string or milliseconds
+        """
+        start_ms = start if isinstance(start, (int, float)) else timestamp_to_ms(start)
+        end_ms = end if isinstance(end, (int, float)) else timestamp_to_ms(end)
+        return bisect_left(self.starts, start_ms), bisect_right(self.starts, end_ms)
+
+    def text(self, start, end):
+        """Return the joined caption text for the window [start, end]."""
+        lo, hi = self.span(start, end)
+        return self.store.joined_text(lo, hi)
+
+    def first_start_at_or_after(self, start, end=None):
+        """
+        Return the start (ms) of the first caption at or after `start`.
+
+        Returns None when there is no such caption, or when it begins after `end`.
+        """
+        lo, hi = self.span(start, end if end is not None else float('inf'))
+        if lo >= hi:
+            return None
+        return self.starts[lo]
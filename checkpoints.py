@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+from instrumentation import event
+
+
+def content_hash(*parts):
+    """
+    Hash the inputs of a build step into its key.
+
+    Args:
+        parts: JSON-serializable values (prompt templates, settings, transcript
+            text, upstream results) or bytes (e.g. caption time arrays)
+
+    Returns:
+        Hex digest that changes whenever any part changes
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, (bytes, bytearray, memoryview)):
+            digest.update(part)
+        else:
+            digest.update(json.dumps(part, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def write_json_atomic(path, value):
+    """Write JSON to a temporary file and rename it into place, so readers never see partial files."""
+    tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(value, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+class RunCheckpoint:
+    """
+    Build graph of one transcript's pipeline artifacts, stored as one JSON file per node.
+
+    A node is a stage result (the overview, one batch outline, the optimized
+    outline, one section, ...) saved under the content hash of its inputs:
+    the text it is computed from, the upstream results it combines, and the
+    prompt, model and settings that shape it. Nodes are found by that key,
+    not by position, so when resuming every node whose inputs are unchanged is
+    reused and only the nodes downstream of an edit are recomputed; a node
+    recomputed to the same value leaves its dependents untouched. Without
+    resume the directory is cleared and everything is built again.
+    """
+
+    def __init__(self, directory, resume=False):
+        self.directory = directory
+        if resume and os.path.isdir(directory):
+            print(f"Resuming from checkpoints in {directory}")
+        else:
+            shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._used = set()
+        self.counts = {}  # kind -> [reused, rebuilt], in the order kinds are first used
+
+    def _path(self, name):
+        with self._lock:
+            self._used.add(f"{name}.json")
+        return os.path.join(self.directory, f"{name}.json")
+
+    def load(self, name):
+        """Return the saved value of a named record, or None if there is none."""
+        path = self._path(name)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save(self, name, value):
+        write_json_atomic(self._path(name), value)
+
+    def _node_name(self, kind, inputs):
+        return f"{kind}-{content_hash(kind, *inputs)[:24]}"
+
+    def _count(self, kind, hit):
+        with self._lock:
+            self.counts.setdefault(kind, [0, 0])[0 if hit else 1] += 1
+
+    def cached(self, kind, compute, inputs=()):
+        """
+        Return the value of a node, computing and saving it if no node of this kind has the same inputs.
+
+        Args:
+            kind: Kind of node, e.g. "section"
+            compute: Function computing the value from the inputs
+            inputs: Everything the value depends on (see content_hash); context
+                that only informs the value, such as the overview given to each
+                section, is left out so that an edit stays local
+        """
+        name = self._node_name(kind, inputs)
+        value = self.load(name)
+        event("checkpoint", stage=kind, hit=value is not None)
+        self._count(kind, value is not None)
+        if value is None:
+            value = compute()
+            self.save(name, value)
+        return value
+
+    async def acached(self, kind, compute, inputs=()):
+        """Like `cached`, for a coroutine function `compute` awaited only when the node is not up to date."""
+        name = self._node_name(kind, inputs)
+        value = self.load(name)
+        event("checkpoint", stage=kind, hit=value is not None)
+        self._count(kind, value is not None)
+        if value is None:
+            value = await compute()
+            self.save(name, value)
+        return value
+
+    def prune(self):
+        """Delete the nodes and records this run did not use, e.g. sections of an outline that changed."""
+        with self._lock:
+            stale = [name for name in os.listdir(self.directory)
+                     if name.endswith(".json") and name not in self._used]
+        for name in stale:
+            os.remove(os.path.join(self.directory, name))
+        return len(stale)
+
+    def report(self):
+        """One line per kind of node: how many were reused and how many rebuilt."""
+        with self._lock:
+            return "\n".join(f"{kind}: {reused} reused, {rebuilt} rebuilt"
+                             for kind, (reused, rebuilt) in self.counts.items())
+
+
+def output_key_path(path):
+    """Where the key of a built output file is recorded: a hidden file next to it."""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.build.json")
+
+
+def is_up_to_date(path, key):
+    """Whether `path` exists and was built from inputs with this key (see record_build)."""
+    key_path = output_key_path(path)
+    if not (os.path.exists(path) and os.path.exists(key_path)):
+        return False
+    with open(key_path, 'r', encoding='utf-8') as f:
+        return json.load(f).get("key") == key
+
+
+def record_build(path, key):
+    """Record the key of the inputs `path` was just built from."""
+    write_json_atomic(output_key_path(path), {"key": key})
+
+
+class OrderedAppender:
+    """
+    Append numbered chunks to a file in order as they complete.
+
+    Chunks may finish out of order when generated concurrently; each one is
+    held back until every chunk before it has been written.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._pending = {}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def add(self, index, text):
+        with self._lock:
+            self._pending[index] = text
+            with open(self.path, 'a', encoding='utf-8') as f:
+                while self._next in self._pending:
+                    f.write(self._pending.pop(self._next))
+                    self._next += 1
+                f.flush()
@@ -0,0 +1,199 @@
+"""
+Command line interface for the transcript -> blog -> screenshots -> docx pipeline.
+
+    python cli.py parse transcript.srt
+    python cli.py outline transcript.srt [--resume]
+    python cli.py write transcript.srt
+    python cli.py screenshots generated_blog.md --url https://youtu.be/... --transcript transcript.srt
+    python cli.py docx final_blog.md
+    python cli.py all transcript.srt --url https://youtu.be/... --output-dir out/talk [--stream]
+
+`outline` stops once the sections are planned; `write` continues from its
+checkpoints. `all --stream` runs stream_pipeline.py, which fetches the video
+as soon as the outline exists and captures screenshots while sections
+stream. Each subcommand imports only what it needs, so `parse` and `--help`
+start without loading LangChain, the Google GenAI client, OpenCV or yt-dlp.
+Defaults come from config.py.
+"""
+import argparse
+import os
+from pathlib import Path
+
+from config import (INPUT, INPUT_MARKDOWN, OUTPUT_MARKDOWN, OUTPUT_JSON, YOUTUBE_URL, SCREENSHOTS_DIR,
+                    CHECKPOINT_DIR, CAPTION_NORMALIZATION, BATCH_TOKEN_BUDGETS, BATCH_OVERLAP_SECONDS, BATCH_PAUSE_WINDOW, TRACE_DIR,
+                    MAX_SECTIONS, TARGET_SECTION_DURATION, SEGMENT_WINDOW_SECONDS, SEGMENT_MIN_SECONDS)
+from instrumentation import span, start_trace
+
+
+def command_parse(args):
+    """Parse a transcript and report its size, planning batches and (with --segments) topic segments, without calling any model."""
+    from batch_planner import batch_report, estimate_tokens, plan_batches
+    from captions import CaptionIndex, load_captions, ms_to_timestamp
+
+    captions = load_captions(args.transcript)
+    if not len(captions):
+        print(f"{args.transcript}: no captions")
+        return
+    chars = len(captions.timestamped_text())
+    print(f"{args.transcript}: {len(captions)} captions, "
+          f"{ms_to_timestamp(captions.starts[0], None)} - {ms_to_timestamp(max(captions.ends), None)}, "
+          f"{chars} characters with timestamps (~{estimate_tokens(chars)} tokens)")
+    if CAPTION_NORMALIZATION is not None:
+        captions = load_captions(args.transcript, CAPTION_NORMALIZATION)
+        normalized_chars = len(captions.timestamped_text())
+        print(f"Normalized: {len(captions)} captions, {normalized_chars} characters with timestamps "
+              f"(~{estimate_tokens(normalized_chars)} tokens, {1 - normalized_chars / chars:.0%} fewer)")
+
+    token_budget = BATCH_TOKEN_BUDGETS[args.model]
+    batches = plan_batches(captions, token_budget, overlap_seconds=BATCH_OVERLAP_SECONDS,
+                           pause_window=BATCH_PAUSE_WINDOW)
+    report = batch_report(captions, batches, token_budget)
+    print(f"Planning batches for {args.model}: {report['calls']} of up to {token_budget} tokens "
+          f"({report['max_tokens']} max, {report['mean_tokens']} mean, {report['mean_fill']:.0%} mean budget fill)")
+
+    if not args.segments:
+        return
+    # SciPy takes longer to import than the rest of `parse` takes to run
+    from topic_segmenter import topic_segments
+
+    ordered = CaptionIndex(captions).store
+    segments = topic_segments(ordered, MAX_SECTIONS, TARGET_SECTION_DURATION,
+                              window_seconds=SEGMENT_WINDOW_SECONDS, min_seconds=SEGMENT_MIN_SECONDS)
+    print(f"Topic segments (PLANNING_MODE = \"segments\"): {len(segments)}, starting at "
+          + ", ".join(ms_to_timestamp(ordered.starts[lo], None) for lo, _ in segments))
+
+
+def command_outline(args):
+    import script_01
+
+    script_01.outline_blog(args.transcript, output_json=args.output_json,
+                           checkpoint_dir=args.checkpoint_dir, resume=args.resume)
+    script_01.print_llm_stats()
+
+
+def command_write(args):
+    import script_01
+
+    # Stages already completed by `outline` (or an interrupted `write`) are loaded from their checkpoints
+    script_01.generate_blog(args.transcript, output_markdown=args.output, output_json=args.output_json,
+                            checkpoint_dir=args.checkpoint_dir, resume=True)
+    script_01.print_llm_stats()
+
+
+def command_screenshots(args):
+    from script_02 import add_screenshots
+
+    add_screenshots(args.markdown, args.output, args.url, args.transcript, args.screenshots_dir)
+
+
+def command_docx(args):
+    from script_03 import build_word_document
+
+    build_word_document(args.markdown, args.output or Path(args.markdown).stem + '.docx', force=args.force)
+
+
+def command_all_streaming(args):
+    import asyncio
+
+    from script_01 import print_llm_stats
+    from script_03 import build_word_document
+    from stream_pipeline import stream_blog
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    final_markdown = os.path.join(args.output_dir, os.path.basename(OUTPUT_MARKDOWN))
+    asyncio.run(stream_blog(
+        args.transcript, args.url,
+        blog_markdown=os.path.join(args.output_dir, os.path.basename(INPUT_MARKDOWN)),
+        output_markdown=final_markdown,
+        screenshots_dir=os.path.join(args.output_dir, os.path.basename(SCREENSHOTS_DIR)),
+        output_json=os.path.join(args.output_dir, os.path.basename(OUTPUT_JSON)),
+        checkpoint_dir=os.path.join(args.output_dir, CHECKPOINT_DIR),
+        resume=args.resume,
+    ))
+    with span("docx"):
+        build_word_document(final_markdown, os.path.join(args.output_dir, Path(final_markdown).stem + '.docx'))
+    print_llm_stats()
+
+
+def command_all(args):
+    if args.stream:
+        return command_all_streaming(args)
+
+    from batch_runner import StageLimits, run_job
+    from script_01 import print_llm_stats
+
+    job = {"name": Path(args.transcript).stem, "transcript": args.transcript, "video_url": args.url,
+           "output_dir": args.output_dir}
+    durations = run_job(job, StageLimits(1, 1, 1), resume=args.resume)
+    print(", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in durations.items()))
+    print_llm_stats()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parse = commands.add_parser("parse", help="Parse a transcript and show its size and planning batches")
+    parse.add_argument("transcript", nargs="?", default=INPUT, help="VTT or SRT transcript")
+    parse.add_argument("--model", default="gemini-1.5-pro", choices=sorted(BATCH_TOKEN_BUDGETS),
+                       help="Model whose batch token budget is used")
+    parse.add_argument("--segments", action="store_true",
+                       help="Also show the topic segments of PLANNING_MODE = \"segments\" (loads SciPy)")
+    parse.set_defaults(handler=command_parse)
+
+    for name, handler, help_text in (
+        ("outline", command_outline, "Summarize the transcript and plan the blog sections"),
+        ("write", command_write, "Write the blog, continuing from the checkpoints of `outline`"),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("transcript", nargs="?", default=INPUT, help="VTT or SRT transcript")
+        command.add_argument("--output-json", default=OUTPUT_JSON, help="Path the outline is written to")
+        command.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR, help="Directory of stage checkpoints")
+        command.set_defaults(handler=handler)
+        if name == "outline":
+            command.add_argument("--resume", action="store_true",
+                                 help="Rebuild only the stages whose inputs changed since the last run")
+        else:
+            command.add_argument("--output", default=INPUT_MARKDOWN, help="Path the blog markdown is written to")
+
+    screenshots = commands.add_parser("screenshots", help="Capture a screenshot per section and embed them")
+    screenshots.add_argument("markdown", nargs="?", default=INPUT_MARKDOWN, help="Blog markdown from `write`")
+    screenshots.add_argument("--output", default=OUTPUT_MARKDOWN, help="Path the blog with screenshots is written to")
+    screenshots.add_argument("--url", default=YOUTUBE_URL, help="YouTube URL of the video")
+    screenshots.add_argument("--transcript", default=INPUT, help="Transcript used to align screenshots with captions")
+    screenshots.add_argument("--screenshots-dir", default=SCREENSHOTS_DIR, help="Directory screenshots are written to")
+    screenshots.set_defaults(handler=command_screenshots)
+
+    docx = commands.add_parser("docx", help="Convert the blog markdown to a Word document")
+    docx.add_argument("markdown", nargs="?", default=OUTPUT_MARKDOWN, help="Blog markdown")
+    docx.add_argument("--output", help="Path of the .docx file (default: the markdown name in the current directory)")
+    docx.add_argument("--force", action="store_true",
+                      help="Convert even when the document is up to date with the markdown and its images")
+    docx.set_defaults(handler=command_docx)
+
+    run_all = commands.add_parser("all", help="Run every stage for one transcript and video")
+    run_all.add_argument("transcript", nargs="?", default=INPUT, help="VTT or SRT transcript")
+    run_all.add_argument("--url", default=YOUTUBE_URL, help="YouTube URL of the video")
+    run_all.add_argument("--output-dir", default=".", help="Directory all outputs are written to")
+    run_all.add_argument("--resume", action="store_true",
+                         help="Rebuild only the blog stages whose inputs changed since the last run")
+    run_all.add_argument("--stream", action="store_true",
+                         help="Capture screenshots while sections stream instead of after the blog is written")
+    run_all.set_defaults(handler=command_all)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # The main input of the subcommand: the markdown for screenshots and docx, the transcript otherwise
+    path = getattr(args, "markdown", None) or args.transcript
+    if not os.path.exists(path):
+        raise SystemExit(f"Error: {path} does not exist")
+
+    start_trace(f"cli_{args.command}", TRACE_DIR)
+    with span(args.command):
+        args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
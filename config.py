@@ -11,7 +11,93 @@ INPUT = INPUT_SRT  # Choose which input subtitle file to use (INPUT_SRT or INPUT
 
 # YouTube settings
 YOUTUBE_URL = 'https://youtu.be/6Yd6NdJrn4s?si=gljMMfWhvjaxMVmw'  # Source video URL
+VIDEO_SOURCE = None  # Local video file to take screenshots from instead of downloading YOUTUBE_URL
+VIDEO_FETCH_MODE = "segments"  # "segments" fetches only short windows around screenshots; "full" downloads the whole video
+VIDEO_SEGMENT_SECONDS = 2  # Length of video fetched at each screenshot time in "segments" mode
+VIDEO_SOURCE_SEGMENTS = False  # Cut VIDEO_SOURCE into "segments"-mode windows with ffmpeg instead of reading it in place, to run the segment path offline
+VIDEO_CACHE_DIR = ".video_cache"  # Downloaded videos are kept here across runs (None downloads to a temp file that is removed)
+VIDEO_CACHE_MAX_BYTES = 5 * 1024 ** 3  # Size budget of the video cache; least recently used videos are evicted
 
 # Section settings
 MAX_SECTIONS = 10  # Maximum number of sections allowed
 TARGET_SECTION_DURATION = 300  # Target duration for each section in seconds
+SECTION_DUPLICATE_OVERLAP = 0.5  # Overlapping sections sharing this fraction of the shorter one are merged as duplicates
+
+# Planning settings
+PLANNING_MODE = "llm"  # "llm" plans sections per caption batch with the Pro model; "segments" cuts topics locally and has Flash title each one
+PLANNING_WORKERS = 4  # Number of planning calls run concurrently: caption batches (Pro) or topic segments (Flash) (1 = serial)
+SEGMENT_WINDOW_SECONDS = 60  # Seconds of captions compared on each side of a candidate topic boundary in "segments" mode
+SEGMENT_MIN_SECONDS = 120  # Topic segments are at least this long in "segments" mode
+
+# LLM cache settings
+LLM_CACHE_PATH = ".llm_cache/responses.sqlite"  # Persistent LLM response cache (None disables caching)
+LLM_CACHE_MAX_BYTES = 200 * 1024 * 1024  # Size budget for cached responses; least recently used entries are evicted
+
+# Screenshot settings
+SCREENSHOT_CAPTION_SNAP = 5  # Snap each screenshot forward to the first caption starting within this many seconds
+SCREENSHOT_FORMAT = "jpg"  # Screenshot file format: "png", "jpg" or "webp"
+SCREENSHOT_QUALITY = 85  # JPEG/WebP quality (1-100); ignored for PNG
+SCREENSHOT_MAX_WIDTH = 1280  # Wider frames are downscaled once at capture time (None keeps full resolution)
+SCREENSHOT_ENCODE_WORKERS = 4  # Threads encoding screenshots while frames are being decoded
+SCREENSHOT_SELECTION = "first"  # "first" captures each section's start; "scene" picks the best-scoring frame inside the section
+SCENE_SCAN_FORMAT = 'worst[height>=144]/worst'  # Low-resolution YouTube format scanned in "scene" mode
+SCENE_SAMPLE_SECONDS = 2  # Seconds between candidate frames in "scene" mode
+SCENE_MAX_SAMPLES = 60  # Maximum candidate frames per section (the stride widens for long sections)
+SCENE_SCAN_WIDTH = 160  # Width candidate frames are downscaled to before scoring
+SCREENSHOT_DEDUP = "reuse"  # Near-duplicate screenshots: "reuse" the earlier file, "skip" the later section, or None to keep all
+SCREENSHOT_DEDUP_DISTANCE = 6  # Frames whose 64-bit difference hashes differ in at most this many bits are near-duplicates
+SCREENSHOT_SEEK_THRESHOLD = 2  # Decode forward up to this many seconds instead of seeking, until grab/seek costs are measured
+
+# Caption normalization settings
+CAPTION_NORMALIZATION = {  # Applied right after parsing: drops rolling-caption repeats and merges short cues (None keeps cues as they are)
+    "min_chars": 60,  # Merged units end at the first sentence end after this many characters
+    "max_chars": 240,  # Units never grow past this many characters
+    "max_gap_ms": 1000,  # Cues separated by a longer pause are never merged
+}
+
+# Batch planning settings
+BATCH_TOKEN_BUDGETS = {  # Estimated transcript tokens per planning batch, per model
+    "gemini-1.5-pro": 8000,
+    "gemini-1.5-flash": 8000,
+}
+BATCH_OVERLAP_SECONDS = 0  # Repeat this many seconds of captions at the start of the next batch (0 = no overlap)
+BATCH_PAUSE_WINDOW = 0.2  # Fraction of the budget in which batches are cut at the longest pause between captions
+
+# Gemini rate limit settings
+LLM_RATE_LIMITS = {  # Requests and tokens per minute per model, shared by every call in the process (lower these on the free tier)
+    "gemini-1.5-pro": {"rpm": 360, "tpm": 2_000_000},
+    "gemini-1.5-flash": {"rpm": 1000, "tpm": 2_000_000},
+}
+LLM_CALL_DEADLINES = {  # Seconds a call may take including rate-limit waits and retries
+    "gemini-1.5-pro": 600,
+    "gemini-1.5-flash": 180,
+}
+LLM_MAX_ATTEMPTS = 6  # Attempts per call, the first included, before a throttled (429) or 5xx error is raised
+LLM_INITIAL_CONCURRENCY = 4  # Concurrent calls per model to start with; grows on success, halves on 429s
+LLM_MAX_CONCURRENCY = 16  # Upper bound of the adaptive concurrency per model
+
+# Overview settings
+OVERVIEW_MODE = "map_reduce"  # "map_reduce" summarizes the whole transcript; "head" summarizes only its first 10,000 characters
+OVERVIEW_CHUNK_TOKENS = 8000  # Estimated transcript tokens per chunk in the map step
+OVERVIEW_WORKERS = 8  # Concurrent Flash calls in the map and reduce steps (fan-out width)
+OVERVIEW_REDUCE_FANIN = 8  # Summaries merged per reduce call
+OVERVIEW_MAX_REDUCE_DEPTH = 3  # Maximum number of reduce passes, including the final overview call
+
+# Section generation settings
+SECTION_CONTEXT_MODE = "planned"  # "planned" passes outline summaries of previous sections (parallel); "generated" passes their written content (serial)
+SECTION_WORKERS = 8  # Concurrent Flash calls when SECTION_CONTEXT_MODE is "planned"
+
+# Checkpoint settings
+CHECKPOINT_DIR = ".checkpoints"  # Per-run stage checkpoints used by `python script_01.py --resume`
+
+# Word document settings
+DOCX_IMAGE_WIDTH_INCHES = 6  # Width of embedded screenshots in the .docx
+DOCX_IMAGE_MAX_PIXELS = 1200  # Wider images are downscaled before embedding (200 dpi at 6 inches)
+
+# Batch runner settings
+RUNNER_LLM_JOBS = 2  # Jobs generating blogs at once in batch_runner.py (each also fans out its own LLM calls)
+RUNNER_NETWORK_JOBS = 2  # Jobs downloading video at once
+RUNNER_CPU_JOBS = 2  # Jobs capturing screenshots or writing Word documents at once
+
+# Instrumentation settings
+TRACE_DIR = ".traces"  # Each run writes <script>-<time>-<pid>.jsonl and a Chrome .trace.json here (None disables tracing)
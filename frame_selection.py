@@ -0,0 +1,83 @@
+import cv2
+import numpy as np
+
+
+def to_scan_frame(frame, width):
+    """Downscale a BGR frame to a small grayscale array for scoring."""
+    height = max(1, round(frame.shape[0] * width / frame.shape[1]))
+    small = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+
+def _normalize(values):
+    """Scale values to [0, 1]; constant inputs map to 0."""
+    span = values.max() - values.min()
+    if span == 0:
+        return np.zeros_like(values)
+    return (values - values.min()) / span
+
+
+def frame_scores(frames, bins=32):
+    """
+    Score a stack of small grayscale frames for use as a section screenshot.
+
+    Three vectorized measures are combined, each normalized across the stack:
+    - sharpness: variance of the Laplacian, low for blurred or faded frames
+    - text-likeness: share of pixels with a strong horizontal gradient, high for
+      slides, code and diagrams
+    - stability: one minus the histogram difference to the neighbouring
+      samples, low for frames in the middle of a transition or cut
+
+    Args:
+        frames: uint8 array of shape (n, height, width)
+        bins: Number of histogram bins used for the stability measure
+
+    Returns:
+        float array of n scores; higher is better
+    """
+    stack = frames.astype(np.float32)
+    n = len(stack)
+
+    laplacian = (4 * stack[:, 1:-1, 1:-1] - stack[:, :-2, 1:-1] - stack[:, 2:, 1:-1]
+                 - stack[:, 1:-1, :-2] - stack[:, 1:-1, 2:])
+    sharpness = laplacian.reshape(n, -1).var(axis=1)
+
+    horizontal_gradient = np.abs(np.diff(stack, axis=2))
+    text_likeness = (horizontal_gradient > 40).reshape(n, -1).mean(axis=1)
+
+    # Per-frame histograms in one bincount by offsetting each frame's bins
+    bin_index = (frames.astype(np.int64) * bins // 256) + (np.arange(n) * bins)[:, None, None]
+    histograms = np.bincount(bin_index.ravel(), minlength=n * bins).reshape(n, bins).astype(np.float32)
+    histograms /= histograms.sum(axis=1, keepdims=True)
+    step_difference = np.abs(np.diff(histograms, axis=0)).sum(axis=1) / 2  # In [0, 1]
+    to_previous = np.concatenate([[0.0], step_difference])
+    to_next = np.concatenate([step_difference, [0.0]])
+    stability = 1 - np.maximum(to_previous, to_next)
+
+    return 0.4 * _normalize(sharpness) + 0.4 * _normalize(text_likeness) + 0.2 * stability
+
+
+def best_frame_index(frames):
+    """Return the index of the highest-scoring frame in a stack."""
+    if len(frames) == 1:
+        return 0
+    return int(np.argmax(frame_scores(np.asarray(frames))))
+
+
+def dhash(frame, hash_size=8):
+    """
+    Compute a difference hash of a frame as a hash_size * hash_size bit integer.
+
+    The frame is shrunk to (hash_size + 1) x hash_size grayscale pixels and each
+    bit records whether a pixel is brighter than its right neighbour, so small
+    changes in encoding, scaling or brightness leave the hash (nearly) unchanged.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming_distance(a, b):
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count('1')
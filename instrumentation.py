@@ -0,0 +1,148 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+_tracer = None
+
+
+class Tracer:
+    """
+    Collect timed spans and instant events for one run.
+
+    Every event is appended to a JSON lines file as it completes, and the
+    whole run is written as a Chrome trace-event file (open it in
+    chrome://tracing or https://ui.perfetto.dev) when the tracer is closed.
+    Threads get their own lanes, so concurrent LLM calls and encoder work
+    show up side by side.
+    """
+
+    def __init__(self, name, directory):
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+        self.jsonl_path = f"{stem}.jsonl"
+        self.trace_path = f"{stem}.trace.json"
+        self._origin_ns = time.perf_counter_ns()
+        self._events = []
+        self._lock = threading.Lock()
+        self._jsonl = open(self.jsonl_path, 'w', encoding='utf-8')
+        self._pid = os.getpid()
+
+    def record(self, name, category, start_ns, end_ns, attrs):
+        """Record a span (or an instant event when end_ns is None); times are perf_counter_ns values."""
+        start_us = (start_ns - self._origin_ns) / 1000
+        thread = threading.current_thread()
+        event = {"name": name, "cat": category, "ph": "X" if end_ns is not None else "i",
+                 "ts": start_us, "pid": self._pid, "tid": thread.ident, "args": attrs}
+        record = {"name": name, "category": category, "start_ms": round(start_us / 1000, 3),
+                  "thread": thread.name, **attrs}
+        if end_ns is not None:
+            event["dur"] = (end_ns - start_ns) / 1000
+            record["duration_ms"] = round(event["dur"] / 1000, 3)
+        else:
+            event["s"] = "t"
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._events.append(event)
+            self._jsonl.write(line + "\n")
+
+    def events(self):
+        """Return a copy of the events recorded so far, in Chrome trace-event form."""
+        with self._lock:
+            return list(self._events)
+
+    def close(self):
+        with self._lock:
+            if self._jsonl.closed:
+                return
+            self._jsonl.close()
+            thread_names = [{"name": "thread_name", "ph": "M", "pid": self._pid, "tid": thread.ident,
+                             "args": {"name": thread.name}} for thread in threading.enumerate()]
+            with open(self.trace_path, 'w', encoding='utf-8') as f:
+                json.dump({"traceEvents": thread_names + self._events, "displayTimeUnit": "ms"}, f, default=str)
+        print(f"Trace written to {self.trace_path} ({len(self._events)} events, JSON lines in {self.jsonl_path})")
+
+
+def start_trace(name, directory):
+    """
+    Start tracing this process; spans are no-ops until this is called.
+
+    Args:
+        name: Prefix of the trace files, e.g. the script name
+        directory: Directory for the trace files (None leaves tracing off)
+    """
+    global _tracer
+    if directory is None or _tracer is not None:
+        return _tracer
+    _tracer = Tracer(name, directory)
+    atexit.register(_tracer.close)
+    return _tracer
+
+
+def active_tracer():
+    """Return the tracer of this process, or None while tracing is off."""
+    return _tracer
+
+
+class _Span:
+    __slots__ = ("name", "category", "attrs", "_start")
+
+    def __init__(self, name, category, attrs):
+        self.name = name
+        self.category = category
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        """Attach measurements known only once the work is done, e.g. bytes written."""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        tracer = _tracer
+        if tracer is not None:
+            tracer.record(self.name, self.category, self._start, time.perf_counter_ns(), self.attrs)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, category="stage", **attrs):
+    """
+    Time a block of work:
+
+        with span("process_screenshots", screenshots=len(timestamps)) as s:
+            ...
+            s.set(bytes_written=total_bytes)
+
+    Returns a shared no-op span while tracing is off.
+    """
+    if _tracer is None:
+        return _NULL_SPAN
+    return _Span(name, category, attrs)
+
+
+def event(name, category="event", **attrs):
+    """Record an instant event, e.g. a cache hit."""
+    tracer = _tracer
+    if tracer is not None:
+        tracer.record(name, category, time.perf_counter_ns(), None, attrs)
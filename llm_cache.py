@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from langchain_core.caches import BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+from instrumentation import event
+
+
+def make_cache_key(prompt, llm_string):
+    """
+    Build a content-addressed cache key for one LLM invocation.
+
+    LangChain passes the fully rendered prompt (template plus inputs) as `prompt`
+    and the serialized model parameters (model name, temperature, ...) as
+    `llm_string`, so hashing both covers everything that affects the response.
+    """
+    payload = json.dumps([llm_string, prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _encode_generations(generations):
+    records = []
+    for generation in generations:
+        if isinstance(generation, ChatGeneration):
+            records.append({"message": message_to_dict(generation.message)})
+        else:
+            records.append({"text": generation.text})
+    return json.dumps(records, ensure_ascii=False)
+
+
+def _decode_generations(value):
+    generations = []
+    for record in json.loads(value):
+        if "message" in record:
+            message = messages_from_dict([record["message"]])[0]
+            generations.append(ChatGeneration(message=message))
+        else:
+            generations.append(Generation(text=record["text"]))
+    return generations
+
+
+class DiskLLMCache(BaseCache):
+    """
+    Persistent, size-bounded LRU cache for LLM responses backed by SQLite.
+
+    Entries are keyed by `make_cache_key`. Each hit refreshes the entry's
+    last-used time; when the stored responses exceed `max_bytes`, the least
+    recently used entries are evicted.
+    """
+
+    def __init__(self, path, max_bytes=200 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used)")
+        self._conn.commit()
+
+    def lookup(self, prompt, llm_string):
+        key = make_cache_key(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                event("llm_cache_lookup", "llm", hit=False)
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+        event("llm_cache_lookup", "llm", hit=True)
+        return _decode_generations(row[0])
+
+    def update(self, prompt, llm_string, return_val):
+        key = make_cache_key(prompt, llm_string)
+        value = _encode_generations(return_val)
+        size = len(value.encode('utf-8'))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM llm_cache ORDER BY last_used ASC")
+        stale_keys = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale_keys.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", stale_keys)
+
+    def clear(self, **kwargs):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self):
+        """Return hit/miss counters and the current on-disk footprint."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "bytes": size,
+        }
@@ -0,0 +1,393 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+from pydantic import ConfigDict
+
+from batch_planner import estimate_tokens
+from instrumentation import active_tracer
+
+
+class DeadlineExceeded(TimeoutError):
+    """A model call did not complete (including waits and retries) before its deadline."""
+
+
+def _remaining(deadline):
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `per_minute` units per minute.
+
+    The bucket holds at most one minute's worth of units. `charge` may take it
+    below zero (e.g. when a response used more tokens than estimated); later
+    acquisitions then wait until the debt has been refilled.
+    """
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.level = per_minute
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount, deadline=None):
+        """Block until `amount` units are available and take them."""
+        amount = min(amount, self.capacity)  # Larger requests would never fit
+        while True:
+            with self._lock:
+                self._refill()
+                if self.level >= amount:
+                    self.level -= amount
+                    return
+                wait = (amount - self.level) / self.rate
+            remaining = _remaining(deadline)
+            if remaining is not None and remaining < wait:
+                raise DeadlineExceeded(f"Rate limit wait of {wait:.1f}s exceeds the call deadline")
+            time.sleep(wait)
+
+    def charge(self, amount):
+        """Take units without waiting, e.g. to account for tokens known only after a call."""
+        with self._lock:
+            self._refill()
+            self.level -= amount
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on concurrent calls.
+
+    Every successful call raises the limit by 1/limit (about +1 per round of
+    calls); a throttled call halves it. Calls already in flight when the limit
+    is halved often get throttled too, so the limit is cut at most once per
+    `cooldown` seconds.
+    """
+
+    def __init__(self, initial, minimum=1, maximum=32, cooldown=1.0):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self, deadline=None):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                remaining = _remaining(deadline)
+                if remaining is not None and remaining <= 0:
+                    raise DeadlineExceeded("No concurrency slot became free before the call deadline")
+                self._condition.wait(remaining)
+            self.in_flight += 1
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def on_success(self):
+        with self._condition:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def on_throttle(self):
+        with self._condition:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown:
+                self.limit = max(self.minimum, self.limit / 2)
+                self._last_decrease = now
+
+
+class ModelGovernor:
+    """
+    Request and token rate limits plus adaptive concurrency for one model.
+
+    One governor is shared by every caller of a model in the process (see
+    `governor_for`), so concurrent stages and batch jobs draw on the same quota.
+    """
+
+    def __init__(self, name, requests_per_minute, tokens_per_minute, initial_concurrency=4, max_concurrency=32):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.concurrency = AdaptiveConcurrency(initial_concurrency, maximum=max_concurrency)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.throttled = 0
+        self.retries = 0
+
+    def acquire(self, tokens, deadline=None):
+        """Wait for a request slot, token budget and concurrency slot; pair with release()."""
+        self.requests.acquire(1, deadline)
+        self.tokens.acquire(tokens, deadline)
+        self.concurrency.acquire(deadline)
+
+    def release(self):
+        self.concurrency.release()
+
+    def record(self, throttled=False, retried=False):
+        with self._lock:
+            self.calls += 1
+            self.throttled += throttled
+            self.retries += retried
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "concurrency_limit": int(self.concurrency.limit),
+        }
+
+
+_governors = {}
+_governors_lock = threading.Lock()
+
+
+def governor_for(name, limits, initial_concurrency=4, max_concurrency=32):
+    """
+    Return the process-wide governor for a model, creating it on first use.
+
+    Args:
+        name: Model name, e.g. "gemini-1.5-pro"
+        limits: Dict with "rpm" (requests per minute) and "tpm" (tokens per minute)
+    """
+    with _governors_lock:
+        if name not in _governors:
+            _governors[name] = ModelGovernor(name, limits["rpm"], limits["tpm"], initial_concurrency, max_concurrency)
+        return _governors[name]
+
+
+def is_throttled(error):
+    """Whether an exception (or one it was raised from) is an HTTP 429 / RESOURCE_EXHAUSTED response."""
+    while error is not None:
+        if getattr(error, 'code', None) == 429 or getattr(error, 'status_code', None) == 429:
+            return True
+        if 'RESOURCE_EXHAUSTED' in str(error):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def is_transient(error):
+    """Whether an exception is a server-side (5xx) failure worth retrying."""
+    while error is not None:
+        code = getattr(error, 'code', None) or getattr(error, 'status_code', None)
+        if isinstance(code, int) and code >= 500:
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class GovernedChatModel(BaseChatModel):
+    """
+    Chat model wrapper that paces calls through a ModelGovernor.
+
+    LangChain checks the LLM cache before calling `_generate`, so cached
+    responses never wait for or consume quota. Each call gets a deadline
+    covering rate-limit waits and retries. Throttled and 5xx responses are
+    retried with jittered exponential backoff, up to `max_attempts` attempts
+    in all, after which the last error is raised; the wrapped model is asked
+    for a single attempt per call so its own retries do not stall behind a 429.
+    Streamed calls (`astream`) are paced the same way, but are retried only
+    until their first chunk, as chunks already passed on cannot be taken back.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: BaseChatModel
+    governor: Any
+    deadline_seconds: Optional[float] = None
+    max_attempts: int = 6
+    backoff_seconds: float = 1.0
+    max_backoff_seconds: float = 30.0
+
+    @property
+    def _llm_type(self):
+        return self.inner._llm_type
+
+    @property
+    def _identifying_params(self):
+        return self.inner._identifying_params
+
+    def _get_llm_string(self, stop=None, **kwargs):
+        # Cache responses under the wrapped model's identity, so wrapping does not invalidate the cache
+        return self.inner._get_llm_string(stop=stop, **kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        deadline = time.monotonic() + self.deadline_seconds if self.deadline_seconds else None
+        prompt_tokens = estimate_tokens(sum(len(str(message.content)) for message in messages))
+        attempt = 0
+        while True:
+            self.governor.acquire(prompt_tokens, deadline)
+            try:
+                remaining = _remaining(deadline)
+                if remaining is not None and remaining <= 0:
+                    raise DeadlineExceeded(f"{self.governor.name} call deadline passed before the request")
+                result = self.inner._generate(messages, stop=stop, run_manager=run_manager,
+                                              timeout=remaining, max_retries=1, **kwargs)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                throttled = is_throttled(e)
+                if not (throttled or is_transient(e)):
+                    raise
+                if throttled:
+                    self.governor.concurrency.on_throttle()
+                # Without a deadline the attempt limit is what stops a call that keeps failing
+                if attempt + 1 >= self.max_attempts:
+                    self.governor.record(throttled=throttled)
+                    raise
+                self.governor.record(throttled=throttled, retried=True)
+                error = e
+            else:
+                self.governor.concurrency.on_success()
+                self.governor.record()
+                usage = getattr(result.generations[0].message, "usage_metadata", None) if result.generations else None
+                output_tokens = (usage or {}).get("output_tokens") or estimate_tokens(
+                    sum(len(generation.text) for generation in result.generations))
+                self.governor.tokens.charge(output_tokens)
+                return result
+            finally:
+                self.governor.release()
+
+            delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** attempt) * random.uniform(0.5, 1.0)
+            remaining = _remaining(deadline)
+            if remaining is not None and remaining <= delay:
+                raise DeadlineExceeded(f"{self.governor.name} call would pass its deadline before the next retry") from error
+            time.sleep(delay)
+            attempt += 1
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        inner_type = type(self.inner)
+        if inner_type._astream is BaseChatModel._astream and inner_type._stream is BaseChatModel._stream:
+            # The wrapped model cannot stream: answer in one chunk
+            result = await asyncio.to_thread(self._generate, messages, stop, None, **kwargs)
+            message = result.generations[0].message
+            yield ChatGenerationChunk(message=AIMessageChunk(content=message.content,
+                                                             usage_metadata=message.usage_metadata))
+            return
+
+        deadline = time.monotonic() + self.deadline_seconds if self.deadline_seconds else None
+        prompt_tokens = estimate_tokens(sum(len(str(message.content)) for message in messages))
+        attempt = 0
+        while True:
+            # The governor blocks, so it is waited for on a worker thread rather than the event loop
+            await asyncio.to_thread(self.governor.acquire, prompt_tokens, deadline)
+            streamed, output_chars, output_tokens = False, 0, 0
+            try:
+                remaining = _remaining(deadline)
+                if remaining is not None and remaining <= 0:
+                    raise DeadlineExceeded(f"{self.governor.name} call deadline passed before the request")
+                async for chunk in self.inner._astream(messages, stop=stop, run_manager=run_manager,
+                                                       timeout=remaining, max_retries=1, **kwargs):
+                    streamed = True
+                    output_chars += len(chunk.text)
+                    # Streamed chunks report the usage of their own part of the response
+                    output_tokens += (getattr(chunk.message, "usage_metadata", None) or {}).get("output_tokens", 0)
+                    yield chunk
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                throttled = is_throttled(e)
+                if streamed or not (throttled or is_transient(e)):
+                    raise
+                if throttled:
+                    self.governor.concurrency.on_throttle()
+                # Without a deadline the attempt limit is what stops a call that keeps failing
+                if attempt + 1 >= self.max_attempts:
+                    self.governor.record(throttled=throttled)
+                    raise
+                self.governor.record(throttled=throttled, retried=True)
+                error = e
+            else:
+                self.governor.concurrency.on_success()
+                self.governor.record()
+                self.governor.tokens.charge(output_tokens or estimate_tokens(output_chars))
+                return
+            finally:
+                self.governor.release()
+
+            delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** attempt) * random.uniform(0.5, 1.0)
+            remaining = _remaining(deadline)
+            if remaining is not None and remaining <= delay:
+                raise DeadlineExceeded(f"{self.governor.name} call would pass its deadline before the next retry") from error
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+def governed(model, name, limits, deadline_seconds=None, initial_concurrency=4, max_concurrency=32, max_attempts=6):
+    """Wrap a chat model so its calls share the named model's rate limits and adaptive concurrency."""
+    return GovernedChatModel(
+        inner=model,
+        governor=governor_for(name, limits, initial_concurrency, max_concurrency),
+        deadline_seconds=deadline_seconds,
+        max_attempts=max_attempts,
+        callbacks=model.callbacks,  # The wrapped model's _generate is called directly and fires no callbacks
+    )
+
+
+def _message_chars(messages):
+    return sum(len(message.content) if isinstance(message.content, str) else len(str(message.content))
+               for message in messages)
+
+
+class LLMTraceHandler(BaseCallbackHandler):
+    """
+    LangChain callback that records one span per chat model call.
+
+    Spans carry the model, prompt and response sizes in characters and
+    estimated tokens, and the token usage reported by the API when available.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        if active_tracer() is None:
+            return
+        params = kwargs.get("invocation_params") or {}
+        prompt_chars = sum(_message_chars(batch) for batch in messages)
+        with self._lock:
+            self._calls[run_id] = (time.perf_counter_ns(), {
+                "model": params.get("model") or params.get("model_name") or (serialized or {}).get("name"),
+                "prompt_chars": prompt_chars,
+                "prompt_tokens_est": estimate_tokens(prompt_chars),
+            })
+
+    def _finish(self, run_id, attrs):
+        with self._lock:
+            call = self._calls.pop(run_id, None)
+        tracer = active_tracer()
+        if call is None or tracer is None:
+            return
+        start_ns, call_attrs = call
+        call_attrs.update(attrs)
+        tracer.record("llm_call", "llm", start_ns, time.perf_counter_ns(), call_attrs)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        generations = [generation for batch in response.generations for generation in batch]
+        response_chars = sum(len(generation.text) for generation in generations)
+        attrs = {"response_chars": response_chars, "response_tokens_est": estimate_tokens(response_chars)}
+        usage = getattr(getattr(generations[0], "message", None), "usage_metadata", None) if generations else None
+        if usage:
+            attrs["input_tokens"] = usage.get("input_tokens")
+            attrs["output_tokens"] = usage.get("output_tokens")
+        self._finish(run_id, attrs)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, {"error": type(error).__name__})
@@ -1,83 +1,128 @@
 import os
 import subprocess
 import json
-from langchain_google_genai import ChatGoogleGenerativeAI
+import argparse
 from langchain_core.output_parsers import StrOutputParser, JsonOutputParser
 from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
-import webvtt
-import pysrt  # Add this import for SRT support
+from langchain_core.globals import set_llm_cache
 import concurrent.futures
-from typing import List, Dict
-import math
+import threading
 
 from config import *
-
-# Setup Config
-config = {
-    "input": INPUT
-}
+from llm_cache import DiskLLMCache
+from llm_client import governed, LLMTraceHandler
+from instrumentation import span, start_trace
+from captions import load_captions, CaptionIndex, ms_to_timestamp
+from batch_planner import plan_batches, batch_cuts, plan_anchors, batch_report, estimate_tokens
+from section_merger import merge_sections
+from topic_segmenter import topic_segments
+from checkpoints import RunCheckpoint, OrderedAppender, write_json_atomic
 
 # Prepare Transcript
-## Read and parse the VTT or SRT file
-captions = []
-file_extension = os.path.splitext(config['input'])[1].lower()
-
-if file_extension == '.vtt':
-    for caption in webvtt.read(config['input']):
-        captions.append({
-            "start": caption.start,
-            "end": caption.end,
-            "text": caption.text
-        })
-elif file_extension == '.srt':
-    subs = pysrt.open(config['input'])
-    for sub in subs:
-        captions.append({
-            "start": str(sub.start),
-            "end": str(sub.end),
-            "text": sub.text.replace('\n', ' ')
-        })
-else:
-    raise ValueError(f"Unsupported file type: {file_extension}. Only .vtt and .srt files are supported.")
-
-def captions_to_long_text(captions):
-    # Join all the text parts from the captions
-    return " ".join(caption["text"].strip() for caption in captions)
-
-def captions_to_long_text_with_ts(captions):
+def captions_to_long_text(captions, lo=0, hi=None):
+    # Join the text of captions [lo, hi); a single slice of the store's text buffer
+    return captions.joined_text(lo, hi)
+
+def captions_to_long_text_with_ts(captions, lo=0, hi=None):
     """
-    Convert a list of captions to a long text with timestamps.
+    Convert a range of captions to a long text with timestamps.
     Each caption will have its timestamp and text concatenated.
     
     Args:
-        captions (list of dict): List of captions with "start", "end", and "text".
+        captions (CaptionStore): Parsed captions.
+        lo, hi: Caption index range [lo, hi) to convert.
         
     Returns:
         str: Concatenated text with timestamps.
     """
-    long_text = ""
-    for caption in captions:
-        start = caption["start"]
-        end = caption["end"]
-        text = caption["text"].strip()
-        long_text += f"[{start} - {end}] {text}\n"
-    return long_text
-
-## Convert captions to long text
-formatted_text = captions_to_long_text(captions)
-formatted_text_and_ts = captions_to_long_text_with_ts(captions)
+    return captions.timestamped_text(lo, hi)
 
 
 # Setup LLM
-# Load Gemini API key from environment variable
-os.environ["GOOGLE_API_KEY"] = os.getenv("GOOGLE_API_KEY")
-flash_llm = ChatGoogleGenerativeAI(
-    model="gemini-1.5-flash",
-    temperature=0.7,
-    max_tokens=None,
-    timeout=60,
-    max_retries=2,
-)
+FLASH_MODEL = "gemini-1.5-flash"
+PRO_MODEL = "gemini-1.5-pro"
+
+def with_rate_limits(model):
+    """
+    Pace a Gemini model through the shared rate limiter configured in LLM_RATE_LIMITS.
+    
+    All callers of the same model share one request/token budget and an adaptive
+    concurrency limit that backs off on 429s; models without limits are returned as is.
+    """
+    name = model.model.removeprefix("models/")
+    if name not in LLM_RATE_LIMITS:
+        return model
+    return governed(model, name, LLM_RATE_LIMITS[name], LLM_CALL_DEADLINES.get(name),
+                    LLM_INITIAL_CONCURRENCY, LLM_MAX_CONCURRENCY, LLM_MAX_ATTEMPTS)
+
+# Records one trace span per model call while tracing is on
+llm_trace_handler = LLMTraceHandler()
+
+# Created by setup_llm() on first use, so importing this module makes no clients and opens no files
+flash_llm = None
+pro_llm = None
+llm_cache = None
+_llm_ready = False
+_llm_lock = threading.Lock()
+
+def setup_llm():
+    """
+    Create the Gemini models and enable the LLM response cache, once per process.
+    
+    The Google GenAI client is imported here rather than at module load, as it
+    takes about a second to import. Models assigned to flash_llm or pro_llm
+    before the first call (e.g. fakes in benchmarks) are kept. The API key is
+    read from the GOOGLE_API_KEY environment variable.
+    """
+    global flash_llm, pro_llm, llm_cache, _llm_ready
+    with _llm_lock:
+        if _llm_ready:
+            return
+        if flash_llm is None or pro_llm is None:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+
+        if flash_llm is None:
+            flash_llm = with_rate_limits(ChatGoogleGenerativeAI(
+                model=FLASH_MODEL,
+                temperature=0.7,
+                max_tokens=None,
+                timeout=60,
+                max_retries=2,
+                callbacks=[llm_trace_handler],
+            ))
+        if pro_llm is None:
+            pro_llm = with_rate_limits(ChatGoogleGenerativeAI(
+                model=PRO_MODEL,
+                temperature=0.7,
+                max_tokens=None,
+                timeout=None,
+                max_retries=2,
+                callbacks=[llm_trace_handler],
+            ))
+
+        # Cache every LLM response on disk so reruns skip prompts that were already answered
+        if LLM_CACHE_PATH:
+            llm_cache = DiskLLMCache(LLM_CACHE_PATH, max_bytes=LLM_CACHE_MAX_BYTES)
+            set_llm_cache(llm_cache)
+        _llm_ready = True
+
+def map_concurrently(fn, items, max_workers):
+    """
+    Apply fn to every item, running up to max_workers calls at once.
+    
+    Args:
+        fn: Function to apply
+        items: Items to process
+        max_workers: Maximum number of concurrent calls (1 = serial)
+        
+    Returns:
+        List of results in the same order as items
+    """
+    if max_workers <= 1:
+        return [fn(item) for item in items]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # executor.map yields results in submission order, keeping the input order intact
+        return list(executor.map(fn, items))
 
 # Generate Summarise Overview
 overview_sum_prompt = ChatPromptTemplate.from_messages(
@@ -93,14 +138,89 @@ overview_sum_prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-chain = overview_sum_prompt | flash_llm
-overview_sum = chain.invoke(
-    {
-        "transcript": formatted_text[:10000]
-    }
+chunk_sum_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("human", """
+        <transcript_part>
+        {transcript}
+        </transcript_part>
+        This is one consecutive part of a longer transcript. Summarize it in 100 to 250 words.
+        Keep the main ideas, key arguments, names, facts and conclusions in the order they appear.
+        Do not add an introduction or conclusion of your own."""),
+    ]
+)
+
+combine_sum_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("human", """
+        <part_summaries>
+        {summaries}
+        </part_summaries>
+        These are summaries of consecutive parts of one transcript, in order.
+        Merge them into a single summary of 150 to 300 words that keeps the main ideas,
+        key arguments and conclusions, and preserves the order in which they are discussed."""),
+    ]
 )
-overview_sum_content = overview_sum.content
-print(overview_sum_content)
+
+def summarize_overview_map_reduce(captions, chunks=None):
+    """
+    Summarize the whole transcript hierarchically.
+    
+    The transcript is cut into chunks that are summarized in parallel (map),
+    then chunk summaries are merged in groups of OVERVIEW_REDUCE_FANIN per
+    pass (reduce) until they fit one final overview call, or until
+    OVERVIEW_MAX_REDUCE_DEPTH passes have run.
+    
+    Args:
+        captions: CaptionStore with the parsed captions
+        chunks: Caption ranges of the map step (default: plan_batches with OVERVIEW_CHUNK_TOKENS)
+        
+    Returns:
+        Overview summary text
+    """
+    if chunks is None:
+        chunks = plan_batches(captions, OVERVIEW_CHUNK_TOKENS)
+    print(f"\n==== Overview: summarizing {len(chunks)} chunks ====")
+    chunk_chain = chunk_sum_prompt | flash_llm | StrOutputParser()
+    summaries = map_concurrently(
+        lambda chunk: chunk_chain.invoke({"transcript": captions_to_long_text(captions, *chunk)}),
+        chunks,
+        OVERVIEW_WORKERS,
+    )
+
+    combine_chain = combine_sum_prompt | flash_llm | StrOutputParser()
+    depth = 1
+    while len(summaries) > OVERVIEW_REDUCE_FANIN and depth < OVERVIEW_MAX_REDUCE_DEPTH:
+        groups = [summaries[i:i + OVERVIEW_REDUCE_FANIN] for i in range(0, len(summaries), OVERVIEW_REDUCE_FANIN)]
+        print(f"Overview reduce pass {depth}: {len(summaries)} summaries -> {len(groups)}")
+        summaries = map_concurrently(
+            lambda group: combine_chain.invoke({"summaries": "\n\n".join(group)}),
+            groups,
+            OVERVIEW_WORKERS,
+        )
+        depth += 1
+
+    overview_chain = overview_sum_prompt | flash_llm | StrOutputParser()
+    return overview_chain.invoke({"transcript": "\n\n".join(summaries)})
+
+def summarize_overview(captions, chunks=None):
+    if OVERVIEW_MODE == "map_reduce":
+        return summarize_overview_map_reduce(captions, chunks)
+    chain = overview_sum_prompt | flash_llm
+    overview_sum = chain.invoke(
+        {
+            "transcript": captions_to_long_text(captions)[:10000]
+        }
+    )
+    return overview_sum.content
+
+def overview_node_inputs(captions):
+    """Everything the overview depends on: the transcript text, the prompts and the overview settings"""
+    return (
+        [prompt.pretty_repr() for prompt in (overview_sum_prompt, chunk_sum_prompt, combine_sum_prompt)],
+        FLASH_MODEL, OVERVIEW_MODE, OVERVIEW_CHUNK_TOKENS, OVERVIEW_REDUCE_FANIN, OVERVIEW_MAX_REDUCE_DEPTH,
+        captions.joined_text(),
+    )
 
 
 # Planning Section
@@ -119,54 +239,22 @@ class BlogOutline(BaseModel):
 # Initialize the JSON parser with the defined schema
 parser = JsonOutputParser(pydantic_object=BlogOutline)
 
-# Initialize the model
-pro_llm = ChatGoogleGenerativeAI(
-    model="gemini-1.5-pro",
-    temperature=0.7,
-    max_tokens=None,
-    timeout=None,
-    max_retries=2,
-)
-
-def calculate_optimal_batch_size(captions: List[Dict], min_batch_size: int = 50) -> int:
-    """
-    Calculate optimal batch size based on caption length and minimum batch size.
-    
-    Args:
-        captions: List of caption dictionaries
-        min_batch_size: Minimum number of captions per batch
-        
-    Returns:
-        Optimal batch size
-    """
-    total_length = sum(len(caption["text"]) for caption in captions)
-    avg_caption_length = total_length / len(captions)
-    
-    # Target ~10000 characters per batch (adjustable based on model context window)
-    target_chars_per_batch = 10000
-    optimal_size = max(
-        min_batch_size,
-        math.ceil(target_chars_per_batch / avg_caption_length)
-    )
-    return min(optimal_size, len(captions))
-
-def process_batch_with_context(batch_info):
+def process_batch_with_context(captions, batch_info):
     """
     Process a single batch with its context information.
     
     Args:
-        batch_info: Tuple containing (batch, previous_context, batch_number)
+        captions: CaptionStore the batch ranges refer to
+        batch_info: Tuple containing ((lo, hi) caption range, previous_context, batch_number)
         
     Returns:
         Processed batch results
     """
-    batch, previous_context, batch_number = batch_info
-    batch_text = captions_to_long_text_with_ts(batch)
+    (lo, hi), previous_context, batch_number = batch_info
+    batch_text = captions_to_long_text_with_ts(captions, lo, hi)
     return process_transcript_batch(batch_text, previous_context, batch_number)
 
-def process_transcript_batch(transcript_text, previous_context="", batch_number=1):
-    planning_prompt = PromptTemplate(
-        template="""
+PLANNING_TEMPLATE = """
         Analyze the following transcript segment and provide an outline for blog sections. Aim for a comprehensive summary of at least 200 words across all sections. You may create more than 4 sections if the content warrants it for better organization and coverage.
 
         Consider the previous context if provided.
@@ -194,7 +282,11 @@ def process_transcript_batch(transcript_text, previous_context="", batch_number=
         }}
 
         Ensure the combined summaries of all sections are at least 200 words long, providing a detailed overview of the transcript segment. Prioritize clarity, accuracy, and comprehensive coverage of the key topics discussed.  If the transcript is short, still aim for detailed summaries within each section to meet the word count, by elaborating on the key points.
-        """,
+        """
+
+def process_transcript_batch(transcript_text, previous_context="", batch_number=1):
+    planning_prompt = PromptTemplate(
+        template=PLANNING_TEMPLATE,
         input_variables=["transcript", "previous_context"],
         partial_variables={"format_instructions": parser.get_format_instructions()},
     )
@@ -205,12 +297,80 @@ def process_transcript_batch(transcript_text, previous_context="", batch_number=
         "previous_context": previous_context
     })
 
-def optimize_sections(sections):
+class SegmentSummary(BaseModel):
+    title: str = Field(description="Title of the blog section")
+    summary: str = Field(description="Summary of the blog section")
+
+segment_parser = JsonOutputParser(pydantic_object=SegmentSummary)
+
+SEGMENT_TEMPLATE = """
+        The following transcript segment covers one topic of a longer transcript. Give it a blog section title and a summary of 80 to 150 words covering its main points, in the order they are discussed.
+
+        Transcript Segment: {transcript}
+
+        Return a valid JSON object that matches this format:
+        {{
+            "title": "Section Title",
+            "summary": "Section summary text"
+        }}
+        """
+
+def summarize_segment(transcript_text):
+    segment_prompt = PromptTemplate(template=SEGMENT_TEMPLATE, input_variables=["transcript"])
+    chain = segment_prompt | flash_llm | segment_parser
+    return chain.invoke({"transcript": transcript_text})
+
+def plan_segments(checkpoint, captions):
+    """
+    Plan one section per topic segment: boundaries are found locally, the Flash model only titles and summarizes.
+    
+    topic_segmenter cuts the transcript at the deepest valleys of TF-IDF
+    cohesion, so the boundaries take no model call and stay the same from run
+    to run. Segments are independent, so they are summarized concurrently.
+    
+    Args:
+        checkpoint: RunCheckpoint each segment summary is saved to
+        captions: CaptionStore ordered by start time
+        
+    Returns:
+        List of section dictionaries in time order
+    """
+    with span("topic_segments", captions=len(captions)) as segment_span:
+        segments = topic_segments(captions, MAX_SECTIONS, TARGET_SECTION_DURATION,
+                                  window_seconds=SEGMENT_WINDOW_SECONDS, min_seconds=SEGMENT_MIN_SECONDS)
+        segment_span.set(segments=len(segments))
+    ends = [captions.starts[hi] if hi < len(captions) else max(captions.ends) for _, hi in segments]
+    print("\n==== Topic Segmentation ====")
+    print(f"Total captions: {len(captions)}")
+    print(f"Number of segments: {len(segments)}")
+    print(f"Planning workers: {PLANNING_WORKERS}")
+
+    def plan_segment(i):
+        lo, hi = segments[i]
+        with span("plan_segment", segment=i + 1, captions=hi - lo):
+            segment_text = captions_to_long_text(captions, lo, hi)
+            result = checkpoint.cached("segment", lambda: summarize_segment(segment_text),
+                                       inputs=(SEGMENT_TEMPLATE, FLASH_MODEL, segment_text))
+        return {
+            "title": result['title'],
+            "summary": result['summary'],
+            "start_time": ms_to_timestamp(captions.starts[lo], None),
+            "end_time": ms_to_timestamp(ends[i], None),
+        }
+    return map_concurrently(plan_segment, range(len(segments)), PLANNING_WORKERS)
+
+def optimize_sections(sections, caption_index):
     """
     Optimize sections based on configuration parameters.
     
+    Overlapping duplicates (e.g. a topic planned by two neighbouring batches)
+    are merged, broken end times are repaired, and neighbouring sections are
+    merged until at most MAX_SECTIONS remain, so the outline still covers the
+    whole timeline.
+    
     Args:
         sections: List of section dictionaries
+        caption_index: CaptionIndex used to measure the spoken duration of each section
     
     Returns:
         List of optimized sections
@@ -219,115 +379,120 @@ def optimize_sections(sections):
     print(f"Total sections before optimization: {len(sections)}")
     print(f"Maximum sections allowed: {MAX_SECTIONS}")
     
-    if len(sections) <= MAX_SECTIONS:
-        print("No optimization needed. Sections are within the limit.")
-        return sections
-        
-    # Convert time strings to seconds for easier calculation
-    def time_to_seconds(time_str):
-        try:
-            # Handle comma-separated milliseconds format
-            time_str = time_str.replace(',', '.')
-            
-            # Split into components
-            if '.' in time_str:
-                main_time, ms = time_str.split('.')
-            else:
-                main_time = time_str
-                ms = '0'
-            
-            # Convert HH:MM:SS to seconds
-            h, m, s = map(float, main_time.split(':'))
-            total_seconds = h * 3600 + m * 60 + s + float('0.' + ms)
-            return total_seconds
-        except Exception as e:
-            print(f"Error parsing time {time_str}: {str(e)}")
-            return 0
-        
-    def seconds_to_time(seconds):
-        h = int(seconds // 3600)
-        m = int((seconds % 3600) // 60)
-        s = int(seconds % 60)
-        ms = int((seconds % 1) * 1000)
-        return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
-    
-    # Calculate duration and importance for each section
-    sections_with_metrics = []
-    print("\nCalculating section metrics:")
-    for i, section in enumerate(sections, 1):
-        start_seconds = time_to_seconds(section['start_time'])
-        end_seconds = time_to_seconds(section['end_time'])
-        duration = end_seconds - start_seconds
-        
-        # Calculate importance based on summary length and duration
-        importance = len(section['summary']) * (duration / TARGET_SECTION_DURATION) if duration > 0 else 0
-        
-        sections_with_metrics.append({
-            **section,
-            'duration': duration,
-            'importance': importance
-        })
-        
-        print(f"Section {i}: Start={section['start_time']}, End={section['end_time']}, "
-              f"Duration={duration:.2f}s, Importance={importance:.2f}")
-    
-    # Sort sections by importance
-    print("\nSorting sections by importance...")
-    sorted_sections = sorted(sections_with_metrics, key=lambda x: x['importance'], reverse=True)
-    
-    # Take top MAX_SECTIONS sections and sort them by start time
-    print(f"\nSelecting top {MAX_SECTIONS} most important sections:")
-    optimized_sections = sorted(sorted_sections[:MAX_SECTIONS], 
-                              key=lambda x: time_to_seconds(x['start_time']))
+    optimized_sections = merge_sections(sections, caption_index, MAX_SECTIONS, TARGET_SECTION_DURATION,
+                                        duplicate_overlap=SECTION_DUPLICATE_OVERLAP)
     
     # Log the selected sections
-    print("\nSelected Optimized Sections:")
+    print("\nOptimized Sections:")
     for i, section in enumerate(optimized_sections, 1):
         print(f"Section {i}: Start={section['start_time']}, End={section['end_time']}, "
               f"Title='{section['title']}'")
     
-    # Clean up the sections before returning
-    for section in optimized_sections:
-        del section['duration']
-        del section['importance']
-    
     print(f"\n==== Optimization Complete ====")
     print(f"Total sections after optimization: {len(optimized_sections)}")
     return optimized_sections
 
-# Process transcript in batches
-batch_size = calculate_optimal_batch_size(captions)
-print(f"\n==== Batch Processing Configuration ====")
-print(f"Total captions: {len(captions)}")
-print(f"Optimal batch size: {batch_size}")
-
-caption_batches = [captions[i:i + batch_size] for i in range(0, len(captions), batch_size)]
-print(f"Number of batches: {len(caption_batches)}")
-
-previous_context = ""
-
-# Process each batch and collect all sections
-all_sections = []
-print("\n==== Starting Batch Processing ====")
-for i, batch in enumerate(caption_batches, 1):
-    print(f"\nProcessing Batch {i}/{len(caption_batches)}")
-    print(f"Batch size: {len(batch)} captions")
+def plan_caption_batches(captions, previous_cuts=None):
+    """
+    Cut the transcript into planning batches and report their expected cost.
     
-    batch_info = (batch, previous_context, i)
-    result = process_batch_with_context(batch_info)
+    Each batch only needs the raw text of the batch before it as context, so every
+    batch input is known up front and the planning calls can run concurrently.
     
-    print(f"Sections generated in batch {i}: {len(result['outline'])}")
-    all_sections.extend(result['outline'])
+    Args:
+        captions: CaptionStore to cut
+        previous_cuts: batch_cuts record of the previous run; its cuts are kept where they still fit
+            (see plan_batches), unless it was planned with other batch settings
     
-    # Update context with summaries from this batch
-    previous_context = captions_to_long_text(batch)
-
-print("\n==== Batch Processing Complete ====")
-print(f"Total sections generated: {len(all_sections)}")
-
-# Optimize sections based on configuration
-print("\n==== Preparing for Section Optimization ====")
-optimized_sections = optimize_sections(all_sections)
+    Returns:
+        List of ((lo, hi), previous_context, batch_number) tuples
+    """
+    token_budget = BATCH_TOKEN_BUDGETS[PRO_MODEL]
+    caption_batches = plan_batches(
+        captions,
+        token_budget,
+        overlap_seconds=BATCH_OVERLAP_SECONDS,
+        pause_window=BATCH_PAUSE_WINDOW,
+        anchors=plan_anchors(previous_cuts, token_budget, BATCH_OVERLAP_SECONDS, BATCH_PAUSE_WINDOW),
+    )
+    report = batch_report(captions, caption_batches, token_budget,
+                          prompt_overhead_tokens=estimate_tokens(PLANNING_TEMPLATE))
+    print(f"\n==== Batch Processing Configuration ====")
+    print(f"Total captions: {len(captions)}")
+    print(f"Token budget per batch: {token_budget}")
+    print(f"Number of batches: {len(caption_batches)}")
+    print(f"Expected planning calls: {report['calls']}")
+    print(f"Expected prompt tokens: {report['total_tokens']} total, "
+          f"{report['max_tokens']} max, {report['mean_tokens']} mean per call "
+          f"({report['mean_fill']:.0%} mean budget fill)")
+
+    batch_infos = []
+    previous_context = ""
+    for i, batch in enumerate(caption_batches, 1):
+        batch_infos.append((batch, previous_context, i))
+        previous_context = captions_to_long_text(captions, *batch)
+    return batch_infos
+
+def process_batches(checkpoint, captions, batch_infos, max_workers=PLANNING_WORKERS):
+    """
+    Plan all batches, fanning them out to the Pro model when max_workers > 1.
+    
+    Args:
+        checkpoint: RunCheckpoint each batch result is saved to
+        captions: CaptionStore the batch ranges refer to
+        batch_infos: List of ((lo, hi), previous_context, batch_number) tuples
+        max_workers: Maximum number of concurrent planning calls
+        
+    Returns:
+        List of batch results in batch order
+    """
+    def process_checkpointed(batch_info):
+        (lo, hi), previous_context, batch_number = batch_info
+        with span("plan_batch", batch=batch_number, captions=hi - lo):
+            # A batch outline depends on the batch's own transcript; the previous batch is context only
+            batch_text = captions_to_long_text_with_ts(captions, lo, hi)
+            return checkpoint.cached("batch",
+                                     lambda: process_transcript_batch(batch_text, previous_context, batch_number),
+                                     inputs=(PLANNING_TEMPLATE, PRO_MODEL, batch_text))
+    return map_concurrently(process_checkpointed, batch_infos, max_workers)
+
+def plan_batch_sections(checkpoint, captions):
+    """Plan sections batch by batch with the Pro model"""
+    # Cutting where the last run did keeps an edit from shifting the text of every later batch
+    batch_infos = plan_caption_batches(captions, previous_cuts=checkpoint.load("batch_cuts"))
+    checkpoint.save("batch_cuts", batch_cuts(captions, [batch for batch, _, _ in batch_infos],
+                                             BATCH_TOKEN_BUDGETS[PRO_MODEL], BATCH_OVERLAP_SECONDS, BATCH_PAUSE_WINDOW))
+    
+    # Process each batch and collect all sections
+    all_sections = []
+    print("\n==== Starting Batch Processing ====")
+    print(f"Planning workers: {PLANNING_WORKERS}")
+    results = process_batches(checkpoint, captions, batch_infos)
+    for ((lo, hi), _, i), result in zip(batch_infos, results):
+        print(f"\nBatch {i}/{len(batch_infos)}")
+        print(f"Batch size: {hi - lo} captions")
+        print(f"Sections generated in batch {i}: {len(result['outline'])}")
+        all_sections.extend(result['outline'])
+    
+    print("\n==== Batch Processing Complete ====")
+    print(f"Total sections generated: {len(all_sections)}")
+    return all_sections
+
+def plan_outline(checkpoint, captions, caption_index):
+    """Plan sections (per caption batch or per topic segment) and reduce them to the optimized outline"""
+    if PLANNING_MODE == "segments":
+        all_sections = plan_segments(checkpoint, caption_index.store)
+    else:
+        all_sections = plan_batch_sections(checkpoint, captions)
+    
+    # Optimize sections based on configuration
+    print("\n==== Preparing for Section Optimization ====")
+    with span("optimize_sections", sections=len(all_sections)):
+        return checkpoint.cached(
+            "outline", lambda: optimize_sections(all_sections, caption_index),
+            inputs=(MAX_SECTIONS, TARGET_SECTION_DURATION, SECTION_DUPLICATE_OVERLAP, all_sections,
+                    caption_index.starts.tobytes(), caption_index.ends.tobytes()),
+        )
 
 # Generate Each Section
 section_prompt = PromptTemplate(
@@ -344,42 +509,106 @@ section_prompt = PromptTemplate(
     """
 )
 
-sections = optimized_sections
-overall_summary = overview_sum_content # Example overall summary. Replace with a dynamic one if needed.
-previous_summary = ""
-blog_sections = []
-
 def log_progress(current, total):
     """Log the progress of section generation"""
     percent = (current + 1) * 100 // total
     print(f"Generating section {current + 1}/{total} ({percent}% complete)")
 
-for i, section_plan in enumerate(sections):
-    log_progress(i, len(sections))
-    start_time = section_plan['start_time']
-    end_time = section_plan['end_time']
+def section_inputs(caption_index, overall_summary, section_plan, previous_summary):
+    """Build the section_prompt inputs for one planned section, including its slice of the transcript"""
+    try:
+        current_transcript = caption_index.text(section_plan['start_time'], section_plan['end_time'])
+    except ValueError as e:
+        print(f"Could not slice transcript for section '{section_plan['title']}': {e}")
+        current_transcript = ""
 
-    current_transcript = " ".join(
-        caption["text"].strip()
-        for caption in captions
-        if start_time <= caption["start"] <= end_time
-    )
-
-    chain = section_prompt | flash_llm | StrOutputParser()
-    
-    section_result = chain.invoke({
+    return {
         "overall_summ": overall_summary,
         "section_plan": json.dumps(section_plan),
-        "previous_summary": " ".join(blog_section["content"] for blog_section in blog_sections[-2:]),
+        "previous_summary": previous_summary,
         "current_transcript": current_transcript
-    })
+    }
+
+def section_node_inputs(section_plan, inputs):
+    """
+    Everything a section depends on: its plan and transcript excerpt, the prompt and the model.
+    
+    The overview and the previous sections are context only, so editing one part
+    of the transcript regenerates just the sections whose plan or excerpt changed.
+    """
+    return (section_prompt.pretty_repr(), FLASH_MODEL, SECTION_CONTEXT_MODE, section_plan, inputs["current_transcript"])
 
-    blog_sections.append({
+def blog_section(section_plan, content):
+    """Blog section dictionary (as checkpointed) for the content written for a planned section"""
+    return {
         "title": section_plan['title'],
-        "content": section_result,
-        "start_time": start_time,
-        "end_time": end_time
-    })
+        "content": content,
+        "start_time": section_plan['start_time'],
+        "end_time": section_plan['end_time']
+    }
+
+def generate_section(caption_index, overall_summary, section_plan, previous_summary):
+    """
+    Generate the blog content for one planned section.
+    
+    Args:
+        caption_index: CaptionIndex of the transcript
+        overall_summary: Overview of the whole transcript
+        section_plan: Section dictionary from the optimized outline
+        previous_summary: Context describing the sections before this one
+        
+    Returns:
+        Blog section dictionary with title, content and timestamps
+    """
+    chain = section_prompt | flash_llm | StrOutputParser()
+    
+    section_result = chain.invoke(section_inputs(caption_index, overall_summary, section_plan, previous_summary))
+
+    return blog_section(section_plan, section_result)
+
+def planned_context(sections, i):
+    """Planned summaries of the two sections before section i, known before any section is written"""
+    return " ".join(section['summary'] for section in sections[max(0, i - 2):i])
+
+def write_sections(checkpoint, caption_index, overall_summary, sections, output_markdown):
+    """
+    Generate every section (or load it from its checkpoint) and append it to the blog file in order.
+    
+    Returns:
+        List of blog section dictionaries in outline order
+    """
+    section_appender = OrderedAppender(output_markdown)
+
+    def write_section(i, previous_summary):
+        with span("write_section", section=i + 1) as section_span:
+            inputs = section_inputs(caption_index, overall_summary, sections[i], previous_summary)
+            blog_section = checkpoint.cached(
+                "section",
+                lambda: generate_section(caption_index, overall_summary, sections[i], previous_summary),
+                inputs=section_node_inputs(sections[i], inputs),
+            )
+            section_appender.add(i, blog_section['content'] + "\n\n")
+            section_span.set(content_chars=len(blog_section['content']))
+        return blog_section
+
+    def generate_planned_section(i):
+        log_progress(i, len(sections))
+        return write_section(i, planned_context(sections, i))
+
+    if SECTION_CONTEXT_MODE == "planned":
+        # Context comes from the outline, so every section can be written at once
+        print(f"Generating {len(sections)} sections with {SECTION_WORKERS} workers")
+        return map_concurrently(generate_planned_section, range(len(sections)), SECTION_WORKERS)
+
+    # Context is the generated content of the two previous sections, so sections are written in order
+    blog_sections = []
+    for i in range(len(sections)):
+        log_progress(i, len(sections))
+        blog_sections.append(write_section(
+            i,
+            " ".join(blog_section["content"] for blog_section in blog_sections[-2:]),
+        ))
+    return blog_sections
 
 # Generate final summary
 final_summary_prompt = ChatPromptTemplate.from_messages([
@@ -395,24 +624,124 @@ final_summary_prompt = ChatPromptTemplate.from_messages([
     """)
 ])
 
-chain = final_summary_prompt | flash_llm | StrOutputParser()
-final_summary = chain.invoke({"previous_summary": previous_summary})
-
-# Write the blog content
-with open('generated_blog.md', 'w', encoding='utf-8') as f:
-    f.write("# Blog Post\n\n")
-    f.write("## Overview\n")
-    f.write(overview_sum_content)
-    f.write("\n\n")
+def outline_blog(input_path, output_json=OUTPUT_JSON, checkpoint_dir=CHECKPOINT_DIR, resume=False):
+    """
+    Summarize a transcript and plan its sections: every stage before sections are written.
     
-    # Write each section with timestamps
-    for section_data in blog_sections:
-        f.write(section_data['content'])
+    Args:
+        input_path: Path of the VTT or SRT transcript
+        output_json: Path the optimized outline is written to
+        checkpoint_dir: Directory holding one checkpoint directory per transcript
+        resume: Reuse every stage result of the last run whose inputs are unchanged
+        
+    Returns:
+        Tuple of (checkpoint, caption_index, overview, sections) for the writing stages
+    """
+    setup_llm()
+
+    # Every stage result is a node keyed by its inputs, so a resumed run repeats only the paid calls whose inputs changed
+    checkpoint = RunCheckpoint(
+        os.path.join(checkpoint_dir, os.path.splitext(os.path.basename(input_path))[0]),
+        resume=resume,
+    )
+
+    # Read and parse the VTT or SRT file
+    with span("load_captions", path=input_path) as load_span:
+        captions = load_captions(input_path, CAPTION_NORMALIZATION)
+        caption_index = CaptionIndex(captions)
+        load_span.set(captions=len(captions), chars=captions.text_length())
+
+    with span("overview", mode=OVERVIEW_MODE):
+        # Stable chunk cuts let the LLM cache answer every chunk an edit did not touch
+        overview_chunks = plan_batches(captions, OVERVIEW_CHUNK_TOKENS,
+                                       anchors=plan_anchors(checkpoint.load("overview_cuts"), OVERVIEW_CHUNK_TOKENS))
+        checkpoint.save("overview_cuts", batch_cuts(captions, overview_chunks, OVERVIEW_CHUNK_TOKENS))
+        overview_sum_content = checkpoint.cached("overview", lambda: summarize_overview(captions, overview_chunks),
+                                                 inputs=overview_node_inputs(captions))
+    print(overview_sum_content)
+
+    with span("plan_outline") as outline_span:
+        sections = plan_outline(checkpoint, captions, caption_index)
+        outline_span.set(sections=len(sections))
+    write_json_atomic(output_json, {"outline": sections})
+    print(f"Outline written to {output_json}")
+    return checkpoint, caption_index, overview_sum_content, sections
+
+def start_blog_markdown(output_markdown, overview):
+    """Start the blog file with its overview; sections are appended as they are generated"""
+    with open(output_markdown, 'w', encoding='utf-8') as f:
+        f.write("# Blog Post\n\n")
+        f.write("## Overview\n")
+        f.write(overview)
         f.write("\n\n")
+    print(f"Overview written to {output_markdown}")
+
+def finish_blog_markdown(output_markdown, final_summary):
+    """Append the final summary section to the blog file"""
+    with open(output_markdown, 'a', encoding='utf-8') as f:
+        f.write("## Final Thoughts\n")
+        f.write(final_summary)
+        f.write("\n")
+    print(f"Blog post has been written to {output_markdown}")
+
+def generate_blog(input_path, output_markdown=INPUT_MARKDOWN, output_json=OUTPUT_JSON,
+                  checkpoint_dir=CHECKPOINT_DIR, resume=False):
+    """
+    Turn one transcript into a blog post.
     
-    # Add the final summary section
-    f.write("## Final Thoughts\n")
-    f.write(final_summary)
-    f.write("\n")
-
-print("Blog post has been written to generated_blog.md")
+    Args:
+        input_path: Path of the VTT or SRT transcript
+        output_markdown: Path the blog markdown is written to
+        output_json: Path the optimized outline is written to
+        checkpoint_dir: Directory holding one checkpoint directory per transcript
+        resume: Reuse every stage result of the last run whose inputs are unchanged
+    """
+    checkpoint, caption_index, overview_sum_content, sections = outline_blog(
+        input_path, output_json, checkpoint_dir, resume)
+
+    start_blog_markdown(output_markdown, overview_sum_content)
+
+    with span("write_sections", sections=len(sections), mode=SECTION_CONTEXT_MODE):
+        write_sections(checkpoint, caption_index, overview_sum_content, sections, output_markdown)
+
+    previous_summary = ""
+    chain = final_summary_prompt | flash_llm | StrOutputParser()
+    with span("final_summary"):
+        final_summary = checkpoint.cached("final_summary", lambda: chain.invoke({"previous_summary": previous_summary}),
+                                          inputs=(final_summary_prompt.pretty_repr(), FLASH_MODEL, previous_summary))
+
+    finish_blog_markdown(output_markdown, final_summary)
+    finish_build(checkpoint)
+
+def finish_build(checkpoint):
+    """Drop the nodes this run no longer uses and report what was rebuilt"""
+    stale = checkpoint.prune()
+    print(f"\n==== Build Graph ====\n{checkpoint.report()}")
+    if stale:
+        print(f"Removed {stale} stale checkpoints")
+
+def print_llm_stats():
+    if llm_cache is not None:
+        stats = llm_cache.stats()
+        print(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['entries']} entries ({stats['bytes'] / 1024:.1f} KiB)")
+    for llm in (flash_llm, pro_llm):
+        governor = getattr(llm, "governor", None)
+        if governor is not None:
+            stats = governor.stats()
+            print(f"{governor.name}: {stats['calls']} calls, {stats['throttled']} throttled, "
+                  f"{stats['retries']} retries, concurrency limit {stats['concurrency_limit']}")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Generate a blog post from a transcript")
+    arg_parser.add_argument("--resume", action="store_true",
+                            help="Rebuild only the stages whose inputs changed since the last run")
+    args = arg_parser.parse_args()
+
+    start_trace("script_01", TRACE_DIR)
+    with span("generate_blog", input=INPUT):
+        generate_blog(INPUT, resume=args.resume)
+    print_llm_stats()
+
+if __name__ == "__main__":
+    main()
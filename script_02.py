@@ -1,10 +1,25 @@
 import re
 import os
+import json
 import cv2
+import shutil
+import subprocess
 import tempfile
+import threading
+import time
+import concurrent.futures
 from urllib.parse import urlparse, parse_qs
-import yt_dlp
-from config import YOUTUBE_URL, SCREENSHOTS_DIR, INPUT_MARKDOWN, OUTPUT_MARKDOWN
+from config import (YOUTUBE_URL, SCREENSHOTS_DIR, INPUT_MARKDOWN, OUTPUT_MARKDOWN, INPUT, SCREENSHOT_CAPTION_SNAP,
+                    SCREENSHOT_SEEK_THRESHOLD, VIDEO_FETCH_MODE, VIDEO_SOURCE, VIDEO_SOURCE_SEGMENTS, VIDEO_SEGMENT_SECONDS,
+                    VIDEO_CACHE_DIR, VIDEO_CACHE_MAX_BYTES, SCREENSHOT_FORMAT, SCREENSHOT_QUALITY,
+                    SCREENSHOT_MAX_WIDTH, SCREENSHOT_ENCODE_WORKERS, SCREENSHOT_SELECTION, SCENE_SCAN_FORMAT,
+                    SCENE_SAMPLE_SECONDS, SCENE_MAX_SAMPLES, SCENE_SCAN_WIDTH, SCREENSHOT_DEDUP,
+                    SCREENSHOT_DEDUP_DISTANCE, CAPTION_NORMALIZATION, TRACE_DIR)
+from captions import load_captions, CaptionIndex, timestamp_to_ms, ms_to_timestamp
+from video_cache import VideoCache, cache_key
+from frame_selection import to_scan_frame, best_frame_index, dhash, hamming_distance
+from instrumentation import span, start_trace
+from checkpoints import content_hash, write_json_atomic
 
 def get_video_id(youtube_url):
     """Extract video ID from YouTube URL"""
@@ -16,28 +31,47 @@ def get_video_id(youtube_url):
         return parsed_url.path[1:]
     raise ValueError(f"Could not extract video ID from URL: {youtube_url}")
 
-def download_youtube_video(youtube_url):
-    """Download YouTube video in 720p quality"""
+VIDEO_FORMAT = 'best[height<=720]'
+SEGMENT_FORMAT = 'best[height<=720][ext=mp4]/best[height<=720]'
+
+# Downloads are kept across runs in a size-bounded cache keyed by video ID and format
+_video_cache = None
+_video_cache_lock = threading.Lock()
+
+def get_video_cache():
+    """Return the process-wide video cache (None when VIDEO_CACHE_DIR is unset), creating its directory on first use"""
+    global _video_cache
+    with _video_cache_lock:
+        if _video_cache is None and VIDEO_CACHE_DIR:
+            _video_cache = VideoCache(VIDEO_CACHE_DIR, VIDEO_CACHE_MAX_BYTES)
+        return _video_cache
+
+def download_youtube_video(youtube_url, video_format=VIDEO_FORMAT):
+    """Download YouTube video in 720p quality (or the given yt-dlp format)"""
     video_id = get_video_id(youtube_url)
-    output_path = os.path.join(tempfile.gettempdir(), f"{video_id}.mp4")
     
-    if os.path.exists(output_path):
-        print(f"Video already downloaded: {output_path}")
-        return output_path
+    def fetch(output_path):
+        ydl_opts = {
+            'format': video_format,
+            'outtmpl': output_path,
+            'quiet': True
+        }
+        
+        import yt_dlp  # Imported on first download; it adds about 0.4s to startup
+        try:
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                ydl.download([youtube_url])
+            print(f"Video downloaded: {output_path}")
+        except Exception as e:
+            raise Exception(f"Error downloading video: {str(e)}")
     
-    ydl_opts = {
-        'format': 'best[height<=720]',
-        'outtmpl': output_path,
-        'quiet': True
-    }
+    video_cache = get_video_cache()
+    if video_cache is not None:
+        return video_cache.get_or_fetch(cache_key(video_id, video_format), fetch)
     
-    try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([youtube_url])
-        print(f"Video downloaded: {output_path}")
-        return output_path
-    except Exception as e:
-        raise Exception(f"Error downloading video: {str(e)}")
+    output_path = os.path.join(tempfile.gettempdir(), f"{cache_key(video_id, video_format)}.mp4")
+    fetch(output_path)
+    return output_path
 
 def extract_timestamps(markdown_file):
     """Extract timestamps from markdown headings"""
@@ -49,12 +83,19 @@ def extract_timestamps(markdown_file):
     matches = re.finditer(pattern, content)
     return [match.group(1) for match in matches]
 
+def extract_section_windows(markdown_file):
+    """Extract the (start, end) time window of each section heading, keyed by start timestamp"""
+    with open(markdown_file, 'r') as f:
+        content = f.read()
+    
+    pattern = r'## \[(\d{2}:\d{2}:\d{2}) - (\d{2}:\d{2}:\d{2})\]'
+    return {match.group(1): match.group(2) for match in re.finditer(pattern, content)}
+
 def capture_screenshot(video_path, timestamp, output_path):
     """Capture screenshot from video at specific timestamp"""
     try:
         # Convert timestamp to seconds
-        h, m, s = map(int, timestamp.split(':'))
-        seconds = h * 3600 + m * 60 + s
+        seconds = timestamp_to_ms(timestamp) / 1000
         
         # Open video
         cap = cv2.VideoCapture(video_path)
@@ -81,21 +122,440 @@ def capture_screenshot(video_path, timestamp, output_path):
         print(f"Error capturing screenshot at {timestamp}: {str(e)}")
         return False
 
-def process_screenshots(video_path, timestamps, screenshots_dir):
-    """Process screenshots for all timestamps"""
-    results = {}
+def align_to_captions(timestamp, caption_index, max_shift=SCREENSHOT_CAPTION_SNAP):
+    """Move a section timestamp to the first caption starting within max_shift seconds"""
+    start_ms = timestamp_to_ms(timestamp)
+    caption_start = caption_index.first_start_at_or_after(start_ms, start_ms + max_shift * 1000)
+    if caption_start is None:
+        return timestamp
+    return ms_to_timestamp(caption_start)
+
+class FrameReader:
+    """
+    Read frames at increasing timestamps from one open video capture.
+    
+    A target a short distance ahead of the current position is reached by
+    grabbing frames forward, which decodes them without converting them to
+    images. Targets behind the current position, or far enough ahead that
+    decoding forward would be slower than a seek, use a real seek. The
+    trade-off depends on the video's keyframe interval, so the reader measures
+    the cost of each grab and each seek as it goes; until it has both
+    measurements it grabs forward for gaps up to seek_threshold seconds.
+    """
+    
+    def __init__(self, cap, seek_threshold=SCREENSHOT_SEEK_THRESHOLD):
+        self.cap = cap
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        self.seek_threshold_frames = seek_threshold * self.fps
+        self.grab_cost = None  # Seconds per grabbed frame
+        self.seek_cost = None  # Seconds per seek, including decoding up to the target frame
+        self.frames_decoded = 0
+    
+    @staticmethod
+    def _update(average, sample):
+        return sample if average is None else 0.7 * average + 0.3 * sample
+    
+    def _should_grab(self, gap):
+        if gap < 0:
+            return False
+        if self.grab_cost is None or self.seek_cost is None:
+            return gap <= self.seek_threshold_frames
+        return gap * self.grab_cost < self.seek_cost
+    
+    def read_at(self, target_ms):
+        """
+        Read the frame at target_ms.
+        
+        Returns:
+            (success, frame) as returned by cap.read()
+        """
+        target_frame = int(round(target_ms / 1000 * self.fps))
+        gap = target_frame - int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+        
+        start = time.perf_counter()
+        if self._should_grab(gap):
+            for _ in range(gap):
+                if not self.cap.grab():
+                    return False, None
+            self.frames_decoded += gap
+            if gap > 0:
+                self.grab_cost = self._update(self.grab_cost, (time.perf_counter() - start) / gap)
+            ret, frame = self.cap.read()
+        else:
+            self.cap.set(cv2.CAP_PROP_POS_MSEC, target_ms)
+            ret, frame = self.cap.read()
+            self.seek_cost = self._update(self.seek_cost, time.perf_counter() - start)
+        self.frames_decoded += 1
+        return ret, frame
+
+def screenshot_targets(timestamps, caption_index=None):
+    """Map each section timestamp to the time (ms) its screenshot is captured at"""
+    targets = {}
     for timestamp in timestamps:
-        screenshot_name = f"screenshot_{timestamp.replace(':', '_')}.png"
-        screenshot_path = os.path.join(screenshots_dir, screenshot_name)
-        success = capture_screenshot(video_path, timestamp, screenshot_path)
-        results[timestamp] = screenshot_path if success else None
+        capture_at = align_to_captions(timestamp, caption_index) if caption_index else timestamp
+        targets[timestamp] = timestamp_to_ms(capture_at)
+    return targets
+
+def segment_ranges(target_times_ms, window=VIDEO_SEGMENT_SECONDS):
+    """
+    Build the video time ranges needed to capture frames at the given times.
+    
+    Each target needs `window` seconds of video starting at the target;
+    overlapping or touching ranges are merged.
+    
+    Returns:
+        Sorted list of (start_seconds, end_seconds) ranges
+    """
+    ranges = []
+    for target_ms in sorted(target_times_ms):
+        start, end = target_ms / 1000, target_ms / 1000 + window
+        if ranges and start <= ranges[-1][1]:
+            ranges[-1] = (ranges[-1][0], max(ranges[-1][1], end))
+        else:
+            ranges.append((start, end))
+    return ranges
+
+def _download_ranges(youtube_url, ranges, output_dir):
+    """Download the given time ranges with yt-dlp; returns a dictionary mapping each downloaded range to its file"""
+    import yt_dlp
+
+    video_id = get_video_id(youtube_url)
+    ydl_opts = {
+        'format': SEGMENT_FORMAT,
+        'outtmpl': os.path.join(output_dir, f"{video_id}.%(section_start)d-%(section_end)d.%(ext)s"),
+        'download_ranges': yt_dlp.utils.download_range_func(None, ranges),
+        'force_keyframes_at_cuts': True,
+        'quiet': True
+    }
+    
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            ydl.download([youtube_url])
+    except Exception as e:
+        raise Exception(f"Error downloading video segments: {str(e)}")
+    
+    downloaded = {}
+    for start, end in ranges:
+        prefix = f"{video_id}.{int(start)}-{int(end)}."
+        matches = [name for name in os.listdir(output_dir) if name.startswith(prefix)]
+        if matches:
+            downloaded[(start, end)] = os.path.join(output_dir, matches[0])
+        else:
+            print(f"Error: Segment {start:.1f}s-{end:.1f}s was not downloaded")
+    return downloaded
+
+def download_youtube_segments(youtube_url, ranges, output_dir):
+    """
+    Download only the given time ranges of a YouTube video.
+    
+    Uses yt-dlp's download ranges (which requires ffmpeg) with keyframes forced
+    at the cuts, so each segment starts exactly at its range start. With the
+    video cache enabled, segments already cached are reused and only missing
+    ranges are downloaded.
+    
+    Returns:
+        List of (start_ms, end_ms, path) segments
+    """
+    video_cache = get_video_cache()
+    if video_cache is None:
+        downloaded = _download_ranges(youtube_url, ranges, output_dir)
+        segments = [(int(start * 1000), int(end * 1000), path) for (start, end), path in downloaded.items()]
+    else:
+        video_id = get_video_id(youtube_url)
+        keys = {(start, end): cache_key(video_id, SEGMENT_FORMAT, int(start * 1000), int(end * 1000))
+                for start, end in ranges}
+        
+        with video_cache.lock(cache_key(video_id, SEGMENT_FORMAT)):
+            missing = [r for r in ranges if video_cache.get(keys[r]) is None]
+            print(f"Video cache: {len(ranges) - len(missing)} of {len(ranges)} segments cached")
+            if missing:
+                # Download next to the cache so segments can be renamed into it atomically
+                download_dir = tempfile.mkdtemp(prefix="download-", dir=video_cache.directory)
+                try:
+                    for segment_range, path in _download_ranges(youtube_url, missing, download_dir).items():
+                        video_cache.put(keys[segment_range], path)
+                finally:
+                    shutil.rmtree(download_dir, ignore_errors=True)
+        
+        segments = []
+        for start, end in ranges:
+            path = video_cache.get(keys[(start, end)])
+            if path is not None:
+                segments.append((int(start * 1000), int(end * 1000), path))
+        video_cache.evict(keep=tuple(path for _, _, path in segments))
+    
+    print(f"Fetched {len(segments)} video segments "
+          f"({sum(os.path.getsize(path) for _, _, path in segments) / 1e6:.1f} MB)")
+    return segments
+
+def cut_local_segments(video_path, ranges, output_dir):
+    """
+    Cut the given time ranges out of a local video file with ffmpeg, like download_youtube_segments does for YouTube.
+    
+    ffmpeg seeks in the input, so only the frames around each range are
+    decoded, and re-encodes each range losslessly (x264 at qp 0) so it starts
+    exactly at its range start; a stream copy would start at the keyframe
+    before it. Ranges ffmpeg fails to cut are left out.
+    
+    Returns:
+        List of (start_ms, end_ms, path) segments
+    """
+    if shutil.which("ffmpeg") is None:
+        raise Exception("ffmpeg is needed to cut VIDEO_SOURCE into segments (VIDEO_SOURCE_SEGMENTS)")
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    segments = []
+    for start, end in ranges:
+        segment_path = os.path.join(output_dir, f"{stem}.{int(start * 1000)}-{int(end * 1000)}.mkv")
+        command = ["ffmpeg", "-v", "error", "-y", "-ss", f"{start:.3f}", "-i", video_path, "-t", f"{end - start:.3f}",
+                   "-map", "0:v:0", "-c:v", "libx264", "-preset", "ultrafast", "-qp", "0", segment_path]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0 or not os.path.exists(segment_path) or not os.path.getsize(segment_path):
+            print(f"Error: Segment {start:.1f}s-{end:.1f}s could not be cut: {result.stderr.strip()}")
+            continue
+        segments.append((int(start * 1000), int(end * 1000), segment_path))
+    print(f"Cut {len(segments)} video segments from {video_path}")
+    return segments
+
+def screenshot_filename(timestamp):
+    return f"screenshot_{timestamp.replace(':', '_')}.{SCREENSHOT_FORMAT}"
+
+def encode_params():
+    """cv2.imwrite parameters for the configured screenshot format"""
+    if SCREENSHOT_FORMAT in ('jpg', 'jpeg'):
+        return [cv2.IMWRITE_JPEG_QUALITY, SCREENSHOT_QUALITY]
+    if SCREENSHOT_FORMAT == 'webp':
+        return [cv2.IMWRITE_WEBP_QUALITY, SCREENSHOT_QUALITY]
+    return [cv2.IMWRITE_PNG_COMPRESSION, 3]
+
+def encode_screenshot(frame, output_path):
+    """
+    Downscale a frame to SCREENSHOT_MAX_WIDTH and write it in SCREENSHOT_FORMAT.
+    
+    Returns:
+        Number of bytes written (0 on failure)
+    """
+    with span("encode_screenshot", "cpu", path=output_path) as encode_span:
+        height, width = frame.shape[:2]
+        if SCREENSHOT_MAX_WIDTH and width > SCREENSHOT_MAX_WIDTH:
+            new_height = round(height * SCREENSHOT_MAX_WIDTH / width)
+            frame = cv2.resize(frame, (SCREENSHOT_MAX_WIDTH, new_height), interpolation=cv2.INTER_AREA)
+        if not cv2.imwrite(output_path, frame, encode_params()):
+            return 0
+        size = os.path.getsize(output_path)
+        encode_span.set(bytes_written=size)
+        return size
+
+def scan_window(reader, start_ms, end_ms):
+    """
+    Sample small grayscale frames across [start_ms, end_ms).
+    
+    Frames are taken every SCENE_SAMPLE_SECONDS, with the stride widened so
+    that no window yields more than SCENE_MAX_SAMPLES frames.
+    
+    Returns:
+        (times_ms, frames) lists
+    """
+    step = max(SCENE_SAMPLE_SECONDS * 1000, (end_ms - start_ms) / SCENE_MAX_SAMPLES)
+    times, frames = [], []
+    t = start_ms
+    while t < end_ms:
+        ret, frame = reader.read_at(t)
+        if not ret:
+            break
+        times.append(int(t))
+        frames.append(to_scan_frame(frame, SCENE_SCAN_WIDTH))
+        t += step
+    return times, frames
+
+def select_scene_targets(youtube_url, windows):
+    """
+    Pick the most representative frame time within each section window.
+    
+    Windows are scanned in time order on a low-resolution copy of the video
+    (VIDEO_SOURCE when set, otherwise SCENE_SCAN_FORMAT from YouTube), and
+    sampled frames are scored by frame_selection.frame_scores. Only the chosen
+    frames are later decoded at full resolution.
+    
+    Args:
+        youtube_url: Source video URL
+        windows: Dictionary mapping section start timestamps to end timestamps
+        
+    Returns:
+        Dictionary mapping section start timestamps to the chosen time in ms
+    """
+    scan_path = VIDEO_SOURCE or download_youtube_video(youtube_url, SCENE_SCAN_FORMAT)
+    cap = cv2.VideoCapture(scan_path)
+    if not cap.isOpened():
+        print(f"Error: Could not open video file {scan_path}")
+        return {}
+    reader = FrameReader(cap)
+    
+    targets = {}
+    scan_start = time.perf_counter()
+    with span("select_scene_targets", sections=len(windows)) as scan_span:
+        try:
+            for start, end in sorted(windows.items(), key=lambda window: timestamp_to_ms(window[0])):
+                start_ms, end_ms = timestamp_to_ms(start), timestamp_to_ms(end)
+                if end_ms <= start_ms:
+                    continue
+                times, frames = scan_window(reader, start_ms, end_ms)
+                if frames:
+                    targets[start] = times[best_frame_index(frames)]
+                    print(f"Section {start}: best frame at {ms_to_timestamp(targets[start])} of {len(frames)} candidates")
+        finally:
+            cap.release()
+            cleanup_video(scan_path)
+        scan_span.set(frames_decoded=reader.frames_decoded)
+    print(f"Scene selection decoded {reader.frames_decoded} frames in {time.perf_counter() - scan_start:.1f}s")
+    return targets
+
+def process_screenshots(video, timestamps, screenshots_dir, caption_index=None, targets=None, known_frames=None):
+    """
+    Capture screenshots for all timestamps in a single forward pass over the video.
+    
+    Args:
+        video: Path of the full video, or a list of (start_ms, end_ms, path) segments
+        timestamps: Section timestamps to capture
+        screenshots_dir: Directory to write screenshots to
+        caption_index: Optional CaptionIndex used to align screenshots with captions
+        targets: Optional dictionary mapping timestamps to capture times in ms,
+            overriding the times derived from timestamps and caption_index
+        known_frames: Optional list of (hash, timestamp, path) of screenshots
+            captured by earlier calls; this call's screenshots are appended, so
+            screenshots captured in several batches are deduplicated across them
+        
+    Frames whose difference hash is within SCREENSHOT_DEDUP_DISTANCE bits of an
+    already captured screenshot are not encoded again: with SCREENSHOT_DEDUP
+    "reuse" the timestamp points at the earlier file, with "skip" it gets none.
+        
+    Returns:
+        Dictionary mapping each timestamp to its screenshot path (None on failure or when skipped)
+    """
+    with span("process_screenshots", screenshots=len(timestamps)) as screenshots_span:
+        results = {timestamp: None for timestamp in timestamps}
+        segments = video if isinstance(video, list) else [(0, None, video)]
+    
+        # Encoding runs on a pool (OpenCV releases the GIL) while the main thread keeps decoding;
+        # the semaphore bounds how many decoded frames can wait for an encoder
+        encoder = concurrent.futures.ThreadPoolExecutor(max_workers=SCREENSHOT_ENCODE_WORKERS)
+        pending_frames = threading.BoundedSemaphore(2 * SCREENSHOT_ENCODE_WORKERS)
+        encodings = []
+        frames_decoded = 0
+        kept_hashes = list(known_frames or [])  # (hash, timestamp, path) of every frame kept so far
+        duplicates = {}  # timestamp -> (timestamp, path) of the earlier near-identical screenshot
+    
+        # Group targets by the segment that contains them, in time order
+        segment_targets = {}
+        if targets is None:
+            targets = screenshot_targets(timestamps, caption_index)
+        for timestamp, target_ms in sorted(targets.items(), key=lambda item: item[1]):
+            screenshot_path = os.path.join(screenshots_dir, screenshot_filename(timestamp))
+            segment = next((segment for segment in segments
+                            if segment[0] <= target_ms and (segment[1] is None or target_ms < segment[1])), None)
+            if segment is None:
+                print(f"Error: No video segment covers {timestamp}")
+                continue
+            segment_targets.setdefault(segment, []).append((target_ms, timestamp, screenshot_path))
+    
+        try:
+            for (segment_start, _, video_path), captures in segment_targets.items():
+                cap = cv2.VideoCapture(video_path)
+                if not cap.isOpened():
+                    print(f"Error: Could not open video file {video_path}")
+                    continue
+                reader = FrameReader(cap)
+            
+                try:
+                    last_ms, last_frame = None, None
+                    for target_ms, timestamp, screenshot_path in captures:
+                        if target_ms == last_ms:
+                            ret, frame = True, last_frame
+                        else:
+                            ret, frame = reader.read_at(target_ms - segment_start)
+                        if not ret:
+                            print(f"Error: Could not read frame at {timestamp}")
+                            continue
+                        last_ms, last_frame = target_ms, frame
+                    
+                        if SCREENSHOT_DEDUP:
+                            frame_hash = dhash(frame)
+                            original = next((kept for kept_hash, *kept in kept_hashes
+                                             if hamming_distance(frame_hash, kept_hash) <= SCREENSHOT_DEDUP_DISTANCE), None)
+                            if original is not None:
+                                duplicates[timestamp] = original
+                                continue
+                            kept_hashes.append((frame_hash, timestamp, screenshot_path))
+                    
+                        pending_frames.acquire()
+                        future = encoder.submit(encode_screenshot, frame, screenshot_path)
+                        future.add_done_callback(lambda _: pending_frames.release())
+                        encodings.append((timestamp, screenshot_path, future))
+                finally:
+                    frames_decoded += reader.frames_decoded
+                    cap.release()
+        finally:
+            encoder.shutdown(wait=True)
+    
+        total_bytes = 0
+        for timestamp, screenshot_path, future in encodings:
+            size = future.result()
+            if size:
+                print(f"Screenshot saved: {screenshot_path}")
+                results[timestamp] = screenshot_path
+                total_bytes += size
+            else:
+                print(f"Error: Could not write screenshot {screenshot_path}")
+        # Screenshots of earlier calls are already written; this call's may have failed to encode
+        for timestamp, (original, original_path) in duplicates.items():
+            if SCREENSHOT_DEDUP == "reuse":
+                results[timestamp] = results[original] if original in results else original_path
+            print(f"Screenshot at {timestamp} duplicates {original}: {'reused' if results[timestamp] else 'skipped'}")
+        if known_frames is not None:
+            known_frames.extend((frame_hash, timestamp, results.get(timestamp))
+                                for frame_hash, timestamp, _ in kept_hashes[len(known_frames):])
+        print(f"Wrote {len({path for path in results.values() if path})} screenshots ({total_bytes / 1024:.0f} KiB)")
+        screenshots_span.set(frames_decoded=frames_decoded, bytes_written=total_bytes,
+                             files_written=len({path for path in results.values() if path}),
+                             duplicates=len(duplicates))
     return results
 
+def acquire_video(youtube_url, target_times_ms, work_dir):
+    """
+    Fetch the video data needed for the screenshots.
+    
+    A local VIDEO_SOURCE is used as it is, in either mode: process_screenshots
+    seeks in it directly, so nothing is cut or re-encoded. With
+    VIDEO_SOURCE_SEGMENTS, "segments" mode cuts the same windows a download
+    would fetch out of VIDEO_SOURCE instead, so the segment path runs offline.
+    Otherwise "segments" mode downloads only short windows around the targets
+    and "full" mode downloads the whole video.
+    
+    Returns:
+        Path of the full video, or a list of (start_ms, end_ms, path) segments
+    """
+    with span("acquire_video", "network", mode=VIDEO_FETCH_MODE) as fetch_span:
+        if VIDEO_FETCH_MODE == "full" or (VIDEO_SOURCE and not VIDEO_SOURCE_SEGMENTS):
+            video = VIDEO_SOURCE or download_youtube_video(youtube_url)
+            fetch_span.set(bytes=os.path.getsize(video))
+            return video
+        ranges = segment_ranges(target_times_ms)
+        print(f"Fetching {len(ranges)} segments ({sum(end - start for start, end in ranges):.0f}s of video)")
+        if VIDEO_SOURCE:
+            segments = cut_local_segments(VIDEO_SOURCE, ranges, work_dir)
+        else:
+            segments = download_youtube_segments(youtube_url, ranges, work_dir)
+        fetch_span.set(segments=len(segments), bytes=sum(os.path.getsize(path) for _, _, path in segments))
+        return segments
+
 def inject_screenshots_to_markdown(input_file, output_file, screenshot_paths):
-    """Inject screenshots into markdown file"""
+    """Inject screenshots into markdown file, linked relative to the output file"""
     with open(input_file, 'r') as f:
         content = f.readlines()
     
+    output_dir = os.path.dirname(output_file) or '.'
+    screenshot_paths = {timestamp: path and os.path.relpath(path, output_dir)
+                        for timestamp, path in screenshot_paths.items()}
+    
     new_content = []
     pattern = r'## \[(\d{2}:\d{2}:\d{2}) - \d{2}:\d{2}:\d{2}\]'
     
@@ -116,41 +576,146 @@ def inject_screenshots_to_markdown(input_file, output_file, screenshot_paths):
     with open(output_file, 'w') as f:
         f.writelines(new_content)
 
-def cleanup_video(video_path):
-    """Remove the downloaded video file"""
-    try:
-        if os.path.exists(video_path):
-            os.remove(video_path)
-            print(f"Removed video file: {video_path}")
-    except Exception as e:
-        print(f"Error removing video file: {e}")
+def cleanup_video(video):
+    """Remove temporary video files; cached videos and a local VIDEO_SOURCE are kept"""
+    paths = [path for _, _, path in video] if isinstance(video, list) else [video]
+    video_cache = get_video_cache()
+    for video_path in paths:
+        if VIDEO_SOURCE and os.path.abspath(video_path) == os.path.abspath(VIDEO_SOURCE):
+            continue
+        if video_cache is not None and video_cache.contains(video_path):
+            continue
+        try:
+            if os.path.exists(video_path):
+                os.remove(video_path)
+                print(f"Removed video file: {video_path}")
+        except Exception as e:
+            print(f"Error removing video file: {e}")
 
-def main():
-    """Main function to process markdown and inject screenshots"""
-    # Ensure screenshots directory exists
-    os.makedirs(SCREENSHOTS_DIR, exist_ok=True)
+SCREENSHOT_MANIFEST = "screenshots.json"
+
+def video_identity(youtube_url):
+    """What screenshots are taken from: VIDEO_SOURCE's path, size and modification time, or the YouTube video id"""
+    if VIDEO_SOURCE:
+        stat = os.stat(VIDEO_SOURCE)
+        return [os.path.abspath(VIDEO_SOURCE), stat.st_size, stat.st_mtime_ns]
+    return get_video_id(youtube_url)
+
+def screenshot_key(video, target_ms):
+    """Content hash of everything a screenshot depends on: the video, the capture time and the screenshot settings"""
+    return content_hash(video, int(target_ms), VIDEO_FORMAT, SEGMENT_FORMAT, SCREENSHOT_FORMAT, SCREENSHOT_QUALITY,
+                        SCREENSHOT_MAX_WIDTH, SCREENSHOT_DEDUP, SCREENSHOT_DEDUP_DISTANCE)
+
+def reusable_screenshots(screenshots_dir, youtube_url, targets):
+    """
+    Find the screenshots of an earlier run that are still up to date.
     
-    # Download video
-    video_path = download_youtube_video(YOUTUBE_URL)
+    A screenshot is reused when its key (see screenshot_key) matches the one
+    recorded in the directory's manifest and its file still exists, so a rerun
+    only fetches video for new or moved capture times.
     
-    try:
-        # Extract timestamps from markdown
-        timestamps = extract_timestamps(INPUT_MARKDOWN)
-        
-        # Add timestamp for thumbnail
-        if '00:00:00' not in timestamps:
-            timestamps.insert(0, '00:00:00')
+    Args:
+        screenshots_dir: Directory of the earlier screenshots
+        youtube_url: Source video URL
+        targets: Dictionary mapping timestamps to capture times in ms
         
-        # Process screenshots
-        screenshot_paths = process_screenshots(video_path, timestamps, SCREENSHOTS_DIR)
+    Returns:
+        (paths, known_frames): screenshot paths of the up-to-date timestamps, and
+        their (hash, timestamp, path) frames for process_screenshots' known_frames
+    """
+    manifest_path = os.path.join(screenshots_dir, SCREENSHOT_MANIFEST)
+    if not os.path.exists(manifest_path):
+        return {}, []
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    
+    video = video_identity(youtube_url)
+    paths, known_frames = {}, []
+    for timestamp, target_ms in targets.items():
+        entry = manifest.get(timestamp)
+        if entry is None or entry["key"] != screenshot_key(video, target_ms):
+            continue
+        if entry["path"] and not os.path.exists(entry["path"]):
+            continue
+        paths[timestamp] = entry["path"]
+        if entry.get("hash") is not None:
+            known_frames.append((entry["hash"], timestamp, entry["path"]))
+    return paths, known_frames
+
+def record_screenshots(screenshots_dir, youtube_url, targets, paths, known_frames):
+    """Write the manifest reusable_screenshots reads: the key, path and frame hash of every screenshot"""
+    video = video_identity(youtube_url)
+    hashes = {timestamp: frame_hash for frame_hash, timestamp, _ in known_frames}
+    write_json_atomic(os.path.join(screenshots_dir, SCREENSHOT_MANIFEST), {
+        timestamp: {"key": screenshot_key(video, targets[timestamp]), "path": path, "hash": hashes.get(timestamp)}
+        for timestamp, path in paths.items()
+    })
+
+
+def plan_screenshots(input_markdown, youtube_url, transcript=None):
+    """
+    Pick the timestamps and capture times of a blog's screenshots.
+    
+    Args:
+        input_markdown: Blog markdown with `## [HH:MM:SS - HH:MM:SS]` section headings
+        youtube_url: Source video URL (scanned in "scene" selection mode)
+        transcript: Optional VTT or SRT file used to align screenshots with captions
         
-        # Inject screenshots into markdown
-        inject_screenshots_to_markdown(INPUT_MARKDOWN, OUTPUT_MARKDOWN, screenshot_paths)
-        print("Processing complete! Check", OUTPUT_MARKDOWN)
+    Returns:
+        (timestamps, targets) where targets maps each timestamp to a capture time in ms
+    """
+    # Extract timestamps from markdown
+    timestamps = extract_timestamps(input_markdown)
+    
+    # Add timestamp for thumbnail
+    if '00:00:00' not in timestamps:
+        timestamps.insert(0, '00:00:00')
+    
+    # Align screenshots with the transcript when it is available
+    caption_index = CaptionIndex(load_captions(transcript, CAPTION_NORMALIZATION)) if transcript and os.path.exists(transcript) else None
+    
+    # Pick the capture time of each screenshot
+    targets = screenshot_targets(timestamps, caption_index)
+    if SCREENSHOT_SELECTION == "scene":
+        targets.update(select_scene_targets(youtube_url, extract_section_windows(input_markdown)))
+    return timestamps, targets
+
+def add_screenshots(input_markdown, output_markdown, youtube_url, transcript=None, screenshots_dir=SCREENSHOTS_DIR):
+    """Capture a screenshot for every section of a blog and write the blog with the screenshots embedded"""
+    # Ensure screenshots directory exists
+    os.makedirs(screenshots_dir, exist_ok=True)
     
-    finally:
-        # Always cleanup the video, even if an error occurs
-        cleanup_video(video_path)
+    with span("plan_screenshots"):
+        timestamps, targets = plan_screenshots(input_markdown, youtube_url, transcript)
+    
+    # Screenshots of an earlier run with the same video, time and settings are kept
+    screenshot_paths, known_frames = reusable_screenshots(screenshots_dir, youtube_url, targets)
+    missing = [timestamp for timestamp in timestamps if timestamp not in screenshot_paths]
+    print(f"{len(timestamps) - len(missing)} screenshots up to date, {len(missing)} to capture")
+    
+    if missing:
+        # Fetch only the video needed for the missing screenshots
+        video = acquire_video(youtube_url, [targets[timestamp] for timestamp in missing], tempfile.gettempdir())
+        try:
+            # Process screenshots
+            screenshot_paths.update(process_screenshots(
+                video, missing, screenshots_dir,
+                targets={timestamp: targets[timestamp] for timestamp in missing}, known_frames=known_frames))
+        finally:
+            # Always cleanup temporary video files, even if an error occurs
+            cleanup_video(video)
+        record_screenshots(screenshots_dir, youtube_url, targets, screenshot_paths, known_frames)
+    
+    # Inject screenshots into markdown
+    with span("inject_screenshots"):
+        inject_screenshots_to_markdown(input_markdown, output_markdown, screenshot_paths)
+    print("Processing complete! Check", output_markdown)
+
+def main():
+    """Main function to process markdown and inject screenshots"""
+    start_trace("script_02", TRACE_DIR)
+    with span("add_screenshots", markdown=INPUT_MARKDOWN):
+        add_screenshots(INPUT_MARKDOWN, OUTPUT_MARKDOWN, YOUTUBE_URL, INPUT, SCREENSHOTS_DIR)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,16 +1,36 @@
 from pathlib import Path
+import hashlib
+import io
+import os
+import re
 import sys
-from config import INPUT_MARKDOWN, OUTPUT_MARKDOWN
+from config import INPUT_MARKDOWN, OUTPUT_MARKDOWN, DOCX_IMAGE_WIDTH_INCHES, DOCX_IMAGE_MAX_PIXELS, TRACE_DIR
 from docx import Document
 from docx.shared import Inches
-import markdown
-from bs4 import BeautifulSoup
-import re
+import cv2
+from markdown_it import MarkdownIt
+from instrumentation import span, start_trace
+from checkpoints import content_hash, is_up_to_date, record_build
 
-def convert_markdown_to_word(input_file, output_file):
+CODE_FONT = 'Courier New'
+
+HEADING_LINE = re.compile(r'#{1,6}(\s|$)')
+
+MARKDOWN_IMAGE = re.compile(r'!\[[^\]]*\]\(([^)\s]+)')
+
+# python-docx reads these formats; anything else (e.g. WebP screenshots) is re-encoded
+DOCX_IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tif', '.tiff')
+
+def convert_markdown_to_word_html(input_file, output_file):
     """
-    Convert a markdown file to Word document (.docx)
+    Convert a markdown file to Word document (.docx) via HTML.
+
+    Kept for comparison in benchmarks/bench_docx_conversion.py; it drops lists
+    and inline formatting and embeds images at full size.
     """
+    import markdown
+    from bs4 import BeautifulSoup
+
     # Read markdown content
     with open(input_file, 'r', encoding='utf-8') as f:
         md_content = f.read()
@@ -42,6 +62,251 @@ def convert_markdown_to_word(input_file, output_file):
     doc.save(output_file)
     print(f"Successfully converted {input_file} to {output_file}")
 
+def iter_markdown_blocks(lines):
+    """
+    Group markdown lines into chunks that each start at a heading.
+
+    Headings inside fenced code blocks are ignored, so every chunk can be
+    parsed on its own and only one section's tokens are held at a time.
+    """
+    block = []
+    fence = None
+    for line in lines:
+        stripped = line.lstrip()
+        if fence is None and block and HEADING_LINE.match(line):
+            yield "".join(block)
+            block = []
+        if stripped.startswith(('```', '~~~')):
+            marker = stripped[:3]
+            if fence is None:
+                fence = marker
+            elif marker == fence:
+                fence = None
+        block.append(line)
+    if block:
+        yield "".join(block)
+
+class ImageCache:
+    """
+    Downscaled images for embedding, loaded once per path.
+
+    Images wider than max_pixels are resized before `add_picture`, so the
+    document carries no more pixels than it can show at the embedded width.
+    Images that are already small enough are passed through unchanged.
+    """
+
+    def __init__(self, max_pixels):
+        self.max_pixels = max_pixels
+        self._images = {}
+        self.bytes_embedded = 0
+
+    def __len__(self):
+        return len(self._images)
+
+    def get(self, path):
+        """Return a file-like object with the image to embed, or None if it cannot be read."""
+        key = os.path.abspath(path)
+        if key not in self._images:
+            self._images[key] = self._load(path)
+        data = self._images[key]
+        if data is None:
+            return None
+        self.bytes_embedded += len(data)
+        return io.BytesIO(data)
+
+    def _load(self, path):
+        extension = os.path.splitext(path)[1].lower()
+        image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+        if image is None:
+            return None
+        height, width = image.shape[:2]
+        if width <= self.max_pixels and extension in DOCX_IMAGE_EXTENSIONS:
+            with open(path, 'rb') as f:
+                return f.read()
+        if width > self.max_pixels:
+            image = cv2.resize(image, (self.max_pixels, max(1, round(height * self.max_pixels / width))),
+                               interpolation=cv2.INTER_AREA)
+        if extension == '.png':
+            ok, encoded = cv2.imencode('.png', image)
+        else:
+            ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        return encoded.tobytes() if ok else None
+
+class DocxWriter:
+    """
+    Write markdown-it tokens straight into a python-docx Document.
+
+    Supports headings, paragraphs, bullet and numbered lists (up to three
+    levels), block quotes, fenced and indented code, emphasis, strong text,
+    inline code, links (as text) and images.
+    """
+
+    def __init__(self, doc, images, image_width=Inches(6), base_dir='.'):
+        self.doc = doc
+        self.images = images
+        self.image_width = image_width
+        self.base_dir = base_dir  # Relative image paths are resolved against the markdown file's directory
+        self.lists = []  # Stack of 'Bullet' / 'Number' for the open lists
+        self.item_paragraphs = 0  # Paragraphs written so far in the current list item
+        self.quote_depth = 0
+        self._style_ids = {}
+
+    def add_paragraph(self, style=None):
+        """
+        Add a paragraph with a named style.
+
+        python-docx resolves style names by scanning every style on each call,
+        which dominates large documents; the style id is looked up once instead.
+        """
+        paragraph = self.doc.add_paragraph()
+        if style is not None:
+            if style not in self._style_ids:
+                self._style_ids[style] = self.doc.styles[style].style_id
+            paragraph._p.style = self._style_ids[style]
+        return paragraph
+
+    def write(self, tokens):
+        heading_level = None
+        for token in tokens:
+            kind = token.type
+            if kind == 'heading_open':
+                heading_level = int(token.tag[1])
+            elif kind == 'heading_close':
+                heading_level = None
+            elif kind in ('bullet_list_open', 'ordered_list_open'):
+                self.lists.append('Bullet' if kind == 'bullet_list_open' else 'Number')
+            elif kind in ('bullet_list_close', 'ordered_list_close'):
+                self.lists.pop()
+            elif kind == 'list_item_open':
+                self.item_paragraphs = 0
+            elif kind == 'blockquote_open':
+                self.quote_depth += 1
+            elif kind == 'blockquote_close':
+                self.quote_depth -= 1
+            elif kind in ('fence', 'code_block'):
+                self.write_code(token.content)
+            elif kind == 'inline':
+                if heading_level is not None:
+                    self.write_inline(self.add_paragraph(f"Heading {heading_level}"), token.children)
+                else:
+                    self.write_paragraph(token.children)
+
+    def _paragraph_style(self):
+        if self.lists:
+            level = min(len(self.lists), 3)
+            suffix = f" {level}" if level > 1 else ""
+            style = f"List {self.lists[-1]}{suffix}" if self.item_paragraphs == 0 else f"List Continue{suffix}"
+            self.item_paragraphs += 1
+            return style
+        if self.quote_depth:
+            return 'Quote'
+        return None
+
+    def write_paragraph(self, children):
+        # A paragraph holding only an image becomes a picture with its alt text as caption
+        content = [child for child in children if child.type != 'softbreak' and (child.type != 'text' or child.content.strip())]
+        if len(content) == 1 and content[0].type == 'image':
+            self.write_image(content[0])
+            return
+        self.write_inline(self.add_paragraph(self._paragraph_style()), children)
+
+    def write_inline(self, paragraph, children):
+        bold = italic = False
+        for child in children:
+            kind = child.type
+            if kind in ('text', 'code_inline'):
+                run = paragraph.add_run(child.content)
+                # Only touch run properties that are set; each one adds XML to the run
+                if kind == 'code_inline':
+                    run.font.name = CODE_FONT
+                if bold:
+                    run.bold = True
+                if italic:
+                    run.italic = True
+            elif kind == 'strong_open':
+                bold = True
+            elif kind == 'strong_close':
+                bold = False
+            elif kind == 'em_open':
+                italic = True
+            elif kind == 'em_close':
+                italic = False
+            elif kind == 'softbreak':
+                paragraph.add_run(' ')
+            elif kind == 'hardbreak':
+                paragraph.add_run().add_break()
+            elif kind == 'image':
+                # Images inside running text are added after the paragraph
+                self.write_image(child)
+
+    def write_code(self, content):
+        paragraph = self.add_paragraph('No Spacing')
+        for i, line in enumerate(content.rstrip('\n').split('\n')):
+            if i:
+                paragraph.add_run().add_break()
+            paragraph.add_run(line).font.name = CODE_FONT
+
+    def write_image(self, token):
+        src = token.attrs.get('src')
+        if src:
+            src = os.path.join(self.base_dir, src)
+        image = self.images.get(src) if src and Path(src).exists() else None
+        if image is None:
+            return
+        self.doc.add_picture(image, width=self.image_width)
+        alt = token.content
+        if alt:
+            self.add_paragraph('Caption').add_run(alt)
+
+def convert_markdown_to_word(input_file, output_file):
+    """
+    Convert a markdown file to Word document (.docx)
+
+    The markdown is read one heading-delimited chunk at a time and its
+    token stream is written directly into the document, without rendering
+    and re-parsing HTML.
+    """
+    md = MarkdownIt('commonmark')
+    doc = Document()
+    images = ImageCache(DOCX_IMAGE_MAX_PIXELS)
+    writer = DocxWriter(doc, images, Inches(DOCX_IMAGE_WIDTH_INCHES), os.path.dirname(input_file) or '.')
+
+    with span("convert_markdown_to_word", "cpu", input=input_file) as convert_span:
+        blocks = 0
+        with open(input_file, 'r', encoding='utf-8') as f:
+            for block in iter_markdown_blocks(f):
+                writer.write(md.parse(block))
+                blocks += 1
+
+        # Save the document
+        with span("save_docx", "cpu"):
+            doc.save(output_file)
+        convert_span.set(blocks=blocks, images=len(images), image_bytes=images.bytes_embedded,
+                         output_bytes=os.path.getsize(output_file))
+    print(f"Successfully converted {input_file} to {output_file}")
+
+def word_document_key(input_file):
+    """Content hash of everything a Word document depends on: the markdown, the images it embeds and the image settings"""
+    with open(input_file, 'r', encoding='utf-8') as f:
+        markdown = f.read()
+    base_dir = os.path.dirname(input_file) or '.'
+    images = []
+    for src in dict.fromkeys(MARKDOWN_IMAGE.findall(markdown)):
+        path = os.path.join(base_dir, src)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                images.append([src, hashlib.sha256(f.read()).hexdigest()])
+    return content_hash(markdown, images, DOCX_IMAGE_WIDTH_INCHES, DOCX_IMAGE_MAX_PIXELS)
+
+def build_word_document(input_file, output_file, force=False):
+    """Convert markdown to Word unless the document was already built from the same markdown and images (or force is set)"""
+    key = word_document_key(input_file)
+    if not force and is_up_to_date(output_file, key):
+        print(f"{output_file} is up to date")
+        return
+    convert_markdown_to_word(input_file, output_file)
+    record_build(output_file, key)
+
 def main():
     input_file = OUTPUT_MARKDOWN
     output_file = Path(input_file).stem + '.docx'
@@ -50,7 +315,8 @@ def main():
         print(f"Error: Input file {input_file} does not exist")
         sys.exit(1)
 
-    convert_markdown_to_word(input_file, output_file)
+    start_trace("script_03", TRACE_DIR)
+    build_word_document(input_file, output_file)
 
 if __name__ == "__main__":
     main()
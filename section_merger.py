@@ -0,0 +1,148 @@
+import heapq
+
+import numpy as np
+
+from captions import ms_to_timestamp, timestamp_to_ms
+
+
+def _parse_ms(timestamp):
+    """Milliseconds of a section timestamp, or -1 when it is missing or unparseable."""
+    try:
+        return timestamp_to_ms(timestamp) if timestamp else -1
+    except ValueError:
+        return -1
+
+
+def _normalized_title(section):
+    return " ".join(str(section.get('title', '')).lower().split())
+
+
+def merge_sections(sections, caption_index, max_sections, target_duration, duplicate_overlap=0.5):
+    """
+    Turn the sections planned for all batches into one non-overlapping outline.
+
+    Timestamps are parsed once into millisecond arrays. Sections are sorted by
+    start, and a missing, unparseable or non-positive end time is replaced by
+    the next section's start (or the end of the transcript). Overlapping
+    sections are then resolved in one sweep: when the overlap covers at least
+    `duplicate_overlap` of the shorter section, or the sections share a title,
+    they are the same topic planned by two batches and are merged; otherwise
+    the earlier section ends where the later one starts. Finally, while there
+    are more than `max_sections`, the pair of neighbours with the lowest
+    combined score is merged (a heap over adjacent pairs, O(n log n)). A
+    section's score is its summary length times the spoken duration covered by
+    captions, relative to `target_duration`.
+
+    Args:
+        sections: Section dictionaries with title, summary, start_time and end_time
+        caption_index: CaptionIndex of the transcript
+        max_sections: Maximum number of sections to return
+        target_duration: Target section duration in seconds
+        duplicate_overlap: Fraction of the shorter section two sections must share to be merged
+
+    Returns:
+        List of section dictionaries in time order, with `HH:MM:SS` timestamps
+    """
+    caption_starts = np.asarray(caption_index.starts, dtype=np.int64)
+    caption_ends = np.asarray(caption_index.ends, dtype=np.int64)
+    transcript_end = int(caption_ends.max()) if len(caption_ends) else 0
+
+    starts = np.array([_parse_ms(section.get('start_time')) for section in sections], dtype=np.int64)
+    ends = np.array([_parse_ms(section.get('end_time')) for section in sections], dtype=np.int64)
+    placeable = (starts >= 0) & (starts < max(transcript_end, 1))
+    order = np.flatnonzero(placeable)[np.argsort(starts[placeable], kind='stable')]
+    sections = [sections[i] for i in order]
+    starts, ends = starts[order], ends[order]
+    if not sections:
+        return []
+
+    # Repair end times against the next start and the end of the transcript
+    next_starts = np.append(starts[1:], transcript_end)
+    invalid = ends <= starts
+    ends[invalid] = np.maximum(next_starts[invalid], starts[invalid] + 1)
+    ends = np.minimum(ends, max(transcript_end, 1))
+    ends = np.maximum(ends, starts + 1)
+
+    summaries = [str(section.get('summary', '')) for section in sections]
+    titles = [_normalized_title(section) for section in sections]
+
+    # One sweep over the sorted intervals: merge duplicates, trim other overlaps
+    kept = []  # [start, end, members]
+    for i in range(len(sections)):
+        start, end = int(starts[i]), int(ends[i])
+        if kept:
+            previous = kept[-1]
+            overlap = min(previous[1], end) - start
+            shorter = min(previous[1] - previous[0], end - start)
+            same_topic = titles[i] == titles[previous[2][-1]] and start <= previous[1]
+            if (overlap > 0 and overlap >= duplicate_overlap * shorter) or same_topic:
+                previous[1] = max(previous[1], end)
+                previous[2].append(i)
+                continue
+            if overlap > 0:
+                previous[1] = start
+        kept.append([start, end, [i]])
+
+    # Spoken duration of [start, end] is measured on the captions starting inside it
+    starts = np.array([interval[0] for interval in kept], dtype=np.int64)
+    ends = np.array([interval[1] for interval in kept], dtype=np.int64)
+    lo = np.searchsorted(caption_starts, starts, side='left')
+    hi = np.searchsorted(caption_starts, ends, side='right')
+    members = [interval[2] for interval in kept]
+    summary_chars = [sum(len(summaries[i]) for i in group) for group in members]
+
+    def score(k):
+        if hi[k] <= lo[k]:
+            return 0.0
+        spoken = (caption_ends[hi[k] - 1] - caption_starts[lo[k]]) / 1000
+        return summary_chars[k] * max(spoken, 0) / target_duration
+
+    n = len(kept)
+    scores = [score(k) for k in range(n)]
+    previous_of = list(range(-1, n - 1))
+    next_of = list(range(1, n + 1))
+    next_of[-1] = -1
+    versions = [0] * n
+    alive = [True] * n
+    heap = [(scores[k] + scores[k + 1], k, 0, 0) for k in range(n - 1)]
+    heapq.heapify(heap)
+
+    remaining = n
+    while remaining > max_sections and heap:
+        _, left, left_version, right_version = heapq.heappop(heap)
+        right = next_of[left]
+        if not alive[left] or right < 0 or versions[left] != left_version or versions[right] != right_version:
+            continue
+        # Fold the right neighbour into the left one
+        ends[left] = ends[right]
+        hi[left] = hi[right]
+        members[left].extend(members[right])
+        summary_chars[left] += summary_chars[right]
+        scores[left] = score(left)
+        versions[left] += 1
+        alive[right] = False
+        next_of[left] = next_of[right]
+        if next_of[right] >= 0:
+            previous_of[next_of[right]] = left
+        remaining -= 1
+        if previous_of[left] >= 0:
+            p = previous_of[left]
+            heapq.heappush(heap, (scores[p] + scores[left], p, versions[p], versions[left]))
+        if next_of[left] >= 0:
+            q = next_of[left]
+            heapq.heappush(heap, (scores[left] + scores[q], left, versions[left], versions[q]))
+
+    merged = []
+    for k in range(n):
+        if not alive[k]:
+            continue
+        group = members[k]
+        # The longest planned summary names the merged section
+        lead = max(group, key=lambda i: len(summaries[i]))
+        merged.append({
+            **sections[lead],
+            'summary': " ".join(summaries[i] for i in group if summaries[i]),
+            'start_time': ms_to_timestamp(starts[k], None),
+            'end_time': ms_to_timestamp(ends[k], None),
+        })
+    return merged
@@ -0,0 +1,272 @@
+"""
+Asyncio pipeline that captures screenshots while the blog is still being written.
+
+The sequential pipeline writes the whole blog, then parses its headings, then
+fetches the video, then captures frames. Here the video fetch starts as soon
+as the outline exists (the planned section starts are the capture targets), and
+sections are streamed from the model: every `## [HH:MM:SS - HH:MM:SS]` heading
+is passed to the capture worker the moment it appears in the stream, so frames
+are captured while later sections are still being generated. Headings whose
+time the outline did not plan get their video fetched on arrival.
+
+    python stream_pipeline.py
+"""
+import asyncio
+import os
+import re
+import tempfile
+import time
+
+from langchain_core.globals import get_llm_cache
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.outputs import ChatGeneration
+
+import script_01
+from config import (INPUT, YOUTUBE_URL, INPUT_MARKDOWN, OUTPUT_MARKDOWN, OUTPUT_JSON, SCREENSHOTS_DIR, CHECKPOINT_DIR,
+                    SECTION_CONTEXT_MODE, SECTION_WORKERS, SCREENSHOT_SELECTION, TRACE_DIR)
+from checkpoints import OrderedAppender
+from instrumentation import event, span, start_trace
+from script_02 import (screenshot_targets, select_scene_targets, reusable_screenshots, record_screenshots, acquire_video,
+                       process_screenshots, inject_screenshots_to_markdown, cleanup_video)
+
+HEADING = re.compile(r'## \[(\d{2}:\d{2}:\d{2}) - \d{2}:\d{2}:\d{2}\]')
+HEADING_LENGTH = len("## [00:00:00 - 00:00:00]")
+
+
+class HeadingScanner:
+    """Find section heading timestamps in streamed text, including headings cut in two by chunk boundaries."""
+
+    def __init__(self):
+        self._tail = ""
+
+    def feed(self, text):
+        """Return the timestamps of the headings completed by this chunk."""
+        buffer = self._tail + text
+        matches = list(HEADING.finditer(buffer))
+        # Keep just enough unmatched text to complete a heading that continues in the next chunk
+        consumed = matches[-1].end() if matches else 0
+        self._tail = buffer[max(consumed, len(buffer) - HEADING_LENGTH + 1):]
+        return [match.group(1) for match in matches]
+
+
+async def stream_text(llm, messages):
+    """
+    Yield the response of a chat model as it is generated, going through the LLM cache like `invoke`.
+
+    LangChain's `astream` skips the LLM cache, so the lookup and update are
+    done here under the same key `invoke` uses: a cached response is yielded
+    in one piece, and a streamed one is stored once it is complete.
+    """
+    cache = get_llm_cache()
+    if cache is not None:
+        prompt, llm_string = dumps(messages), llm._get_llm_string()
+        cached = await asyncio.to_thread(cache.lookup, prompt, llm_string)
+        if cached:
+            yield cached[0].text
+            return
+
+    parts = []
+    async for chunk in llm.astream(messages):
+        parts.append(chunk.text)
+        yield chunk.text
+    if cache is not None:
+        await asyncio.to_thread(cache.update, prompt, llm_string,
+                                [ChatGeneration(message=AIMessage(content="".join(parts)))])
+
+
+async def write_sections(checkpoint, caption_index, overall_summary, sections, output_markdown, headings):
+    """
+    Stream every section (or load it from its checkpoint) into the blog file, in order.
+
+    Args:
+        headings: asyncio.Queue receiving the timestamp of every section heading as it is written
+
+    Returns:
+        List of blog section dictionaries in outline order
+    """
+    section_appender = OrderedAppender(output_markdown)
+
+    async def write_section(i, previous_summary):
+        with span("write_section", section=i + 1) as section_span:
+            inputs = script_01.section_inputs(caption_index, overall_summary, sections[i], previous_summary)
+
+            async def generate():
+                messages = script_01.section_prompt.format_prompt(**inputs).to_messages()
+                scanner = HeadingScanner()
+                parts = []
+                start = time.perf_counter()
+                async for text in stream_text(script_01.flash_llm, messages):
+                    if not parts:
+                        section_span.set(first_chunk_ms=round((time.perf_counter() - start) * 1000, 1))
+                    parts.append(text)
+                    for timestamp in scanner.feed(text):
+                        event("section_heading", section=i + 1, timestamp=timestamp)
+                        headings.put_nowait(timestamp)
+                return script_01.blog_section(sections[i], "".join(parts))
+
+            blog_section = await checkpoint.acached("section", generate,
+                                                    inputs=script_01.section_node_inputs(sections[i], inputs))
+            # Sections loaded from checkpoints were never streamed; the worker skips timestamps it already has
+            for match in HEADING.finditer(blog_section['content']):
+                headings.put_nowait(match.group(1))
+            section_appender.add(i, blog_section['content'] + "\n\n")
+            section_span.set(content_chars=len(blog_section['content']))
+        return blog_section
+
+    if SECTION_CONTEXT_MODE == "planned":
+        # Context comes from the outline, so up to SECTION_WORKERS sections stream at once
+        print(f"Streaming {len(sections)} sections with {SECTION_WORKERS} workers")
+        slots = asyncio.Semaphore(SECTION_WORKERS)
+
+        async def write_planned_section(i):
+            async with slots:
+                script_01.log_progress(i, len(sections))
+                return await write_section(i, script_01.planned_context(sections, i))
+
+        return await asyncio.gather(*(write_planned_section(i) for i in range(len(sections))))
+
+    # Context is the generated content of the two previous sections, so sections are written in order
+    blog_sections = []
+    for i in range(len(sections)):
+        script_01.log_progress(i, len(sections))
+        blog_sections.append(await write_section(
+            i,
+            " ".join(blog_section["content"] for blog_section in blog_sections[-2:]),
+        ))
+    return blog_sections
+
+
+async def capture_screenshots(headings, youtube_url, sections, caption_index, screenshots_dir, work_dir):
+    """
+    Fetch the video needed by the outline, then capture a screenshot for every heading timestamp received.
+
+    Timestamps that arrive while a capture is running are captured together
+    in the next pass over the video. Near-duplicate detection spans all passes.
+
+    Args:
+        headings: asyncio.Queue of section heading timestamps, ended by None
+        youtube_url: Source video URL
+        sections: Optimized outline; its section starts are fetched before any heading arrives
+        caption_index: CaptionIndex used to align screenshots with captions
+        screenshots_dir: Directory to write screenshots to
+        work_dir: Directory for downloaded video segments
+
+    Returns:
+        Dictionary mapping the thumbnail and each heading timestamp to its screenshot path
+    """
+    planned = ['00:00:00'] + [section['start_time'] for section in sections]
+    targets = screenshot_targets(planned, caption_index)
+    if SCREENSHOT_SELECTION == "scene":
+        windows = {section['start_time']: section['end_time'] for section in sections}
+        targets.update(await asyncio.to_thread(select_scene_targets, youtube_url, windows))
+
+    # Screenshots still up to date from an earlier run are neither fetched nor captured again
+    screenshot_paths, known_frames = reusable_screenshots(screenshots_dir, youtube_url, targets)
+    videos, fetched = [], set()
+
+    def fetch(timestamps):
+        missing = [timestamp for timestamp in timestamps if timestamp not in fetched]
+        # A full video (downloaded, or the local VIDEO_SOURCE) covers every timestamp once it is there
+        if not missing or (videos and isinstance(videos[0], str)):
+            return
+        videos.append(acquire_video(youtube_url, [targets[timestamp] for timestamp in missing], work_dir))
+        fetched.update(missing)
+
+    def capture(timestamps):
+        unplanned = [timestamp for timestamp in timestamps if timestamp not in targets]
+        if unplanned:
+            print(f"Headings the outline did not plan: {', '.join(unplanned)}")
+            targets.update(screenshot_targets(unplanned, caption_index))
+        fetch(timestamps)
+        video = videos[0] if isinstance(videos[0], str) else [segment for segments in videos for segment in segments]
+        screenshot_paths.update(process_screenshots(
+            video, timestamps, screenshots_dir,
+            targets={timestamp: targets[timestamp] for timestamp in timestamps},
+            known_frames=known_frames,
+        ))
+
+    try:
+        # The fetch starts before any section is written
+        await asyncio.to_thread(fetch, [timestamp for timestamp in planned if timestamp not in screenshot_paths])
+        batch, finished = ['00:00:00'], False
+        while True:
+            timestamps = [timestamp for timestamp in dict.fromkeys(batch)
+                          if timestamp is not None and timestamp not in screenshot_paths]
+            if timestamps:
+                with span("capture_batch", screenshots=len(timestamps)):
+                    await asyncio.to_thread(capture, timestamps)
+            if finished:
+                if videos:
+                    record_screenshots(screenshots_dir, youtube_url, targets, screenshot_paths, known_frames)
+                return screenshot_paths
+            batch = [await headings.get()]
+            while not headings.empty():
+                batch.append(headings.get_nowait())
+            finished = None in batch
+    finally:
+        for video in videos:
+            cleanup_video(video)
+
+
+async def stream_blog(input_path, youtube_url, blog_markdown=INPUT_MARKDOWN, output_markdown=OUTPUT_MARKDOWN,
+                      screenshots_dir=SCREENSHOTS_DIR, output_json=OUTPUT_JSON, checkpoint_dir=CHECKPOINT_DIR,
+                      resume=False):
+    """
+    Turn one transcript and its video into a blog post with screenshots, capturing frames while sections stream.
+
+    Args:
+        input_path: Path of the VTT or SRT transcript
+        youtube_url: Source video URL
+        blog_markdown: Path the blog markdown is written to
+        output_markdown: Path the blog with screenshots is written to
+        screenshots_dir: Directory screenshots are written to
+        output_json: Path the optimized outline is written to
+        checkpoint_dir: Directory holding one checkpoint directory per transcript
+        resume: Reuse every blog stage result of the last run whose inputs are unchanged
+    """
+    # Planning makes blocking calls from its own thread pools
+    checkpoint, caption_index, overview, sections = await asyncio.to_thread(
+        script_01.outline_blog, input_path, output_json, checkpoint_dir, resume)
+    os.makedirs(screenshots_dir, exist_ok=True)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        headings = asyncio.Queue()
+        capture = asyncio.create_task(capture_screenshots(
+            headings, youtube_url, sections, caption_index, screenshots_dir, work_dir))
+        try:
+            script_01.start_blog_markdown(blog_markdown, overview)
+            with span("write_sections", sections=len(sections), mode=SECTION_CONTEXT_MODE, streaming=True):
+                await write_sections(checkpoint, caption_index, overview, sections, blog_markdown, headings)
+
+            chain = script_01.final_summary_prompt | script_01.flash_llm | StrOutputParser()
+            with span("final_summary"):
+                final_summary = await checkpoint.acached(
+                    "final_summary", lambda: chain.ainvoke({"previous_summary": ""}),
+                    inputs=(script_01.final_summary_prompt.pretty_repr(), script_01.FLASH_MODEL, ""))
+            script_01.finish_blog_markdown(blog_markdown, final_summary)
+            script_01.finish_build(checkpoint)
+
+            headings.put_nowait(None)
+            with span("wait_for_screenshots"):
+                screenshot_paths = await capture
+        except BaseException:
+            capture.cancel()
+            await asyncio.gather(capture, return_exceptions=True)
+            raise
+
+    with span("inject_screenshots"):
+        inject_screenshots_to_markdown(blog_markdown, output_markdown, screenshot_paths)
+    print("Processing complete! Check", output_markdown)
+
+
+def main():
+    start_trace("stream_pipeline", TRACE_DIR)
+    with span("stream_blog", input=INPUT):
+        asyncio.run(stream_blog(INPUT, YOUTUBE_URL))
+    script_01.print_llm_stats()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import re
+from bisect import bisect_left
+
+import numpy as np
+from scipy import sparse
+
+_WORD_PATTERN = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)*")
+
+# Function words and filler carry no topic; everything else is weighted by TF-IDF
+_STOP_WORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here hers herself
+him himself his how i if in into is it its itself just let me more most my myself no nor not now of off on once only
+or other our ours ourselves out over own really right same she should so some such than that the their theirs them
+themselves then there these they this those through to too under until up us very was we were what when where which
+while who whom why will with would you your yours yourself yourselves yeah okay oh um uh like know going gonna get
+got thing things think actually kind sort lot well
+""".split())
+
+
+def caption_term_matrix(captions):
+    """
+    Build the TF-IDF matrix of a caption store: one row per caption, one column per term.
+
+    Args:
+        captions: CaptionStore to vectorize
+
+    Returns:
+        scipy.sparse CSR matrix of shape (captions, terms); empty captions give empty rows
+    """
+    rows, words = [], []
+    for i, (_, _, text) in enumerate(captions.cues()):
+        tokens = [word for word in _WORD_PATTERN.findall(text.lower()) if word not in _STOP_WORDS]
+        rows.extend([i] * len(tokens))
+        words.extend(tokens)
+    if not words:
+        return sparse.csr_matrix((len(captions), 0))
+
+    terms, columns = np.unique(np.array(words), return_inverse=True)
+    # Duplicate (caption, term) entries are summed into term counts
+    counts = sparse.csr_matrix((np.ones(len(words)), (np.array(rows), columns)), shape=(len(captions), len(terms)))
+    document_frequency = np.bincount(counts.indices, minlength=len(terms))
+    idf = np.log((1 + len(captions)) / (1 + document_frequency)) + 1
+    return counts @ sparse.diags(idf)
+
+
+def _window_matrix(lo, hi, columns):
+    """Sparse 0/1 matrix whose row r selects the captions [lo[r], hi[r])."""
+    lengths = hi - lo
+    indptr = np.concatenate(([0], np.cumsum(lengths)))
+    indices = np.arange(indptr[-1]) - np.repeat(indptr[:-1], lengths) + np.repeat(lo, lengths)
+    return sparse.csr_matrix((np.ones(indptr[-1]), indices, indptr), shape=(len(lo), columns))
+
+
+def gap_similarities(captions, matrix, window_seconds):
+    """
+    Lexical cohesion across every gap between consecutive captions.
+
+    The gap before caption g compares the captions starting in the
+    `window_seconds` before it with those starting in the `window_seconds`
+    after it: both windows are summed into TF-IDF vectors with one sparse
+    product each, and the gap scores their cosine similarity.
+
+    Args:
+        captions: CaptionStore ordered by start time
+        matrix: Caption TF-IDF matrix from caption_term_matrix
+        window_seconds: Length of the window on each side of a gap
+
+    Returns:
+        Array of similarities in [0, 1]; entry g - 1 is the gap before caption g
+    """
+    starts = np.asarray(captions.starts, dtype=np.int64)
+    gaps = np.arange(1, len(starts))
+    window_ms = int(window_seconds * 1000)
+    left_lo = np.searchsorted(starts, starts[gaps] - window_ms, side='left')
+    right_hi = np.maximum(np.searchsorted(starts, starts[gaps] + window_ms, side='left'), gaps + 1)
+
+    left = _window_matrix(left_lo, gaps, len(starts)) @ matrix
+    right = _window_matrix(gaps, right_hi, len(starts)) @ matrix
+    dot = np.asarray(left.multiply(right).sum(axis=1)).ravel()
+    norms = (np.sqrt(np.asarray(left.multiply(left).sum(axis=1)).ravel())
+             * np.sqrt(np.asarray(right.multiply(right).sum(axis=1)).ravel()))
+    return np.divide(dot, norms, out=np.zeros_like(dot), where=norms > 0)
+
+
+def depth_scores(similarities, smoothing=3):
+    """
+    TextTiling depth of every gap: how far its smoothed similarity lies below the peaks on either side.
+
+    Args:
+        similarities: Gap similarities from gap_similarities
+        smoothing: Width of the moving average applied first (1 = none)
+
+    Returns:
+        (depths, valleys): depth of every gap, and a boolean mask of the local minima
+    """
+    if smoothing > 1 and len(similarities) > 1:
+        padded = np.pad(similarities, (smoothing // 2, (smoothing - 1) // 2), mode='edge')
+        similarities = np.convolve(padded, np.ones(smoothing) / smoothing, mode='valid')
+    n = len(similarities)
+    padded = np.concatenate(([-np.inf], similarities, [-np.inf]))
+    peaks = (padded[1:-1] >= padded[:-2]) & (padded[1:-1] >= padded[2:])
+    peaks[[0, -1]] = True
+    valleys = ((similarities <= np.concatenate(([np.inf], similarities[:-1])))
+               & (similarities <= np.concatenate((similarities[1:], [np.inf]))))
+
+    # The nearest peak on each side is where climbing away from the gap stops
+    index = np.arange(n)
+    left_peak = np.maximum.accumulate(np.where(peaks, index, 0))
+    right_peak = np.minimum.accumulate(np.where(peaks, index, n - 1)[::-1])[::-1]
+    depths = similarities[left_peak] + similarities[right_peak] - 2 * similarities
+    return depths, valleys
+
+
+def topic_segments(captions, max_segments, target_seconds, window_seconds=60, min_seconds=120):
+    """
+    Cut a transcript into topic segments at the deepest valleys of lexical cohesion, without calling a model.
+
+    Candidate boundaries are the caption gaps whose depth score is a local
+    minimum above TextTiling's cutoff (mean depth minus half its standard
+    deviation). The deepest candidates are kept, each at least `min_seconds`
+    from the transcript ends and from every kept boundary, until there are
+    duration / `target_seconds` segments (at most `max_segments`). The result
+    depends only on the caption text and times, so the same transcript is
+    always cut at the same captions.
+
+    Args:
+        captions: CaptionStore ordered by start time
+        max_segments: Maximum number of segments
+        target_seconds: Target segment duration, which sets how many segments are cut
+        window_seconds: Seconds of captions compared on each side of a gap
+        min_seconds: Minimum segment duration
+
+    Returns:
+        List of (lo, hi) caption index ranges covering every caption, in order
+    """
+    if len(captions) < 2:
+        return [(0, len(captions))] if len(captions) else []
+    starts = np.asarray(captions.starts, dtype=np.int64)
+    first, last = int(starts[0]), int(max(captions.ends))
+    wanted = min(max_segments, max(1, round((last - first) / 1000 / target_seconds)))
+
+    depths, valleys = depth_scores(gap_similarities(captions, caption_term_matrix(captions), window_seconds))
+    if wanted <= 1 or not valleys.any():
+        return [(0, len(captions))]
+    cutoff = depths[valleys].mean() - depths[valleys].std() / 2
+    candidates = np.flatnonzero(valleys & (depths > 0) & (depths >= cutoff))
+    candidates = candidates[np.argsort(-depths[candidates], kind='stable')]
+
+    min_ms = int(min_seconds * 1000)
+    kept_times, cuts = [], []
+    for gap in candidates:
+        cut = int(gap) + 1
+        cut_ms = int(starts[cut])
+        if cut_ms - first < min_ms or last - cut_ms < min_ms:
+            continue
+        position = bisect_left(kept_times, cut_ms)
+        too_close = ((position > 0 and cut_ms - kept_times[position - 1] < min_ms)
+                     or (position < len(kept_times) and kept_times[position] - cut_ms < min_ms))
+        if too_close:
+            continue
+        kept_times.insert(position, cut_ms)
+        cuts.insert(position, cut)
+        if len(cuts) == wanted - 1:
+            break
+
+    bounds = [0] + cuts + [len(captions)]
+    return list(zip(bounds[:-1], bounds[1:]))
@@ -0,0 +1,135 @@
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads within one process are serialized
+    fcntl = None
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+def cache_key(*parts):
+    """Build a filesystem-safe cache key, e.g. cache_key(video_id, 'best[height<=720]')."""
+    return "-".join(re.sub(r'[^A-Za-z0-9]+', '_', str(part)).strip('_') for part in parts)
+
+
+class VideoCache:
+    """
+    Directory of downloaded videos with a byte budget and LRU eviction.
+
+    Files are written to a temporary name and renamed into place, so a crashed
+    download never leaves a partial file under a cache key. Fetches of the same
+    key are serialized with a lock file, so concurrent jobs download a video
+    only once. Hits refresh a file's modification time, which is the recency
+    used for eviction.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f"{key}.mp4")
+
+    def temp_path_for(self, key):
+        """Path for an in-progress download of key, unique to this process and thread."""
+        return os.path.join(self.directory, f"{key}.part-{os.getpid()}-{threading.get_ident()}.mp4")
+
+    def contains(self, path):
+        """Whether path is a file managed by this cache."""
+        return os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.directory)
+
+    @contextmanager
+    def lock(self, key):
+        """Hold an exclusive lock on key across threads and processes."""
+        with _thread_locks_guard:
+            thread_lock = _thread_locks.setdefault(os.path.abspath(self.path_for(key)), threading.Lock())
+        with thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.directory, f"{key}.lock"), 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get(self, key):
+        """Return the cached path for key (marking it recently used), or None."""
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)
+        return path
+
+    def put(self, key, source_path):
+        """Move a completed download into the cache under key; call evict() once all puts are done."""
+        path = self.path_for(key)
+        os.replace(source_path, path)
+        return path
+
+    def get_or_fetch(self, key, fetch):
+        """
+        Return the cached path for key, downloading it first if needed.
+
+        Args:
+            key: Cache key, see cache_key
+            fetch: Function that writes the video to the path it is given
+        """
+        with self.lock(key):
+            path = self.get(key)
+            if path is not None:
+                print(f"Video cache hit: {path}")
+                return path
+            temp_path = self.temp_path_for(key)
+            try:
+                fetch(temp_path)
+                path = self.put(key, temp_path)
+                self.evict(keep=(path,))
+                return path
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+    def evict(self, keep=()):
+        """Remove least recently used videos until the cache fits in max_bytes."""
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.endswith('.mp4') or '.part-' in name:
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path in keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+                print(f"Evicted cached video: {path}")
+            except FileNotFoundError:
+                pass
+
+        # Drop partial downloads left behind by crashed runs
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if '.part-' in name and os.path.isfile(path):
+                try:
+                    if time.time() - os.path.getmtime(path) > 24 * 3600:
+                        os.remove(path)
+                except FileNotFoundError:
+                    pass